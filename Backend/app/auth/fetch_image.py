@@ -1,8 +1,9 @@
-from flask import make_response, send_from_directory, abort, Blueprint, request
+from flask import make_response, send_from_directory, abort, Blueprint, request, Response
 from werkzeug.utils import secure_filename
 import os
 from urllib.parse import unquote
 from ..config import PATHS
+from app.services.crop_store import encode_crop_png
 
 fetch_image_blueprint = Blueprint('fetch_image', __name__)
 
@@ -24,10 +25,16 @@ def serve_image(filename):
         file_path = os.path.join(directory, filename_only)
         if os.path.exists(file_path):
             response = make_response(send_from_directory(directory, filename_only))
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-            response.headers["Pragma"] = "no-cache"
-            response.headers["Expires"] = "0"
-            return response
+        else:
+            # Crops in the packed store are only encoded when they are requested
+            png = encode_crop_png(file_path)
+            if png is None:
+                continue
+            response = Response(png, mimetype='image/png')
+        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
+        return response
 
     print(f"File not found in all directories: {filename_only}")
     return abort(404, description=f"File not found: {filename_only}")
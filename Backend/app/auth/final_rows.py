@@ -6,9 +6,11 @@ from app.services.generators import generate_lists_in_subgroups, generate_predic
 from app.services.modifications import finalize_segmentation_and_lists
 from app.services.save_and_load import get_taal_field, load_lists_in_subgroups, load_row_categories, save_lists_in_subgroups, save_predictions, save_row_categories, update_composition_metadata
 from app.services.save_data import load_rows_from_file, save_rows_to_file
-from app.services.filename_utils import get_image_details_with_path
+from app.services.glyph_index import query_glyphs
 from app.services.user_changes import user_changes
-from ..config import PATHS
+from app.services.crop_memory import forget_crops
+from app.services.pipeline import run_final_rows_pipeline
+from ..config import PATHS, PIPELINE
 
 final_rows_blueprint = Blueprint('final_rows', __name__)
 
@@ -81,14 +83,11 @@ def final_rows():
 
 
     working_composition_folder = PATHS['working_composition']
-    image_files = os.listdir(working_composition_folder)
-    image_info = [get_image_details_with_path(f, working_composition_folder) for f in image_files]
-    image_info = [info for info in image_info if info is not None]
 
-    # Organize images by row and column
+    # Organize images by row and column, glyphs marked 'extra' are left out
     row_col_images = defaultdict(lambda: defaultdict(list))
-    for info in image_info:
-        page_num, row_num, col_num, x, y, width, height, image_path = info
+    for filename, page_num, row_num, col_num, x, y, width, height, _ in query_glyphs(extra=False):
+        image_path = os.path.normpath(os.path.join(working_composition_folder, filename))
         row_col_images[row_num][col_num].append((x, y, width, height, image_path))
     
     # get beat count for given taal
@@ -99,17 +98,23 @@ def final_rows():
     subgroup_ranges = load_rows_from_file("subgroup_ranges")
     subgroup_ranges = [tuple(lst) for lst in subgroup_ranges]
     print("Subgroup Ranges:", subgroup_ranges)
-    subgroups = generate_lists_in_subgroups(subgroup_ranges, row_col_images, beat_count)
-    save_lists_in_subgroups(subgroups)
-    
-    subgroups = load_lists_in_subgroups()
-    update_kann_swar_and_generate_meend_lists()
-
-    subgroups = load_lists_in_subgroups()
-    finalize_segmentation_and_lists()
-
-    subgroups = load_lists_in_subgroups()
-    predicted_results = generate_predictions(subgroups)
+    # Segmentation stages hand their crops to the classifier in memory
+    forget_crops()
+    if PIPELINE['overlap_final_rows']:
+        subgroups, predicted_results = run_final_rows_pipeline(subgroup_ranges, row_col_images, beat_count)
+    else:
+        subgroups = generate_lists_in_subgroups(subgroup_ranges, row_col_images, beat_count)
+        save_lists_in_subgroups(subgroups)
+        
+        subgroups = load_lists_in_subgroups()
+        update_kann_swar_and_generate_meend_lists()
+
+        subgroups = load_lists_in_subgroups()
+        finalize_segmentation_and_lists()
+
+        subgroups = load_lists_in_subgroups()
+        predicted_results = generate_predictions(subgroups)
+    forget_crops()
     print("Predicted Results:", predicted_results)
     save_predictions(predicted_results)
 
@@ -1,26 +1,140 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
 import os
+import json
 from ..config import PATHS
-from app.services.initial_extraction import extract_alphabets
+from app.services.initial_extraction import extract_alphabets, iter_extract_alphabets, discard_lazy_extraction
 from app.services.save_data import save_rows_to_file
-from app.services.annotate_pdf import annotate_pdf_rows
+from app.services.annotate_pdf import annotate_pdf_rows, iter_annotate_pdf_rows
+from app.services.page_selection import get_page_count, parse_page_range, load_page_range
+from app.services.crop_store import list_crops
+from app.services.extraction_cache import cache_enabled, extraction_cache_key, load_cached_extraction, store_extraction
 initial_rows_blueprint = Blueprint('initial_rows', __name__)
 
 @initial_rows_blueprint.route('/get_initial_rows', methods=['GET'])
 def get_initial_rows():
     pdf_path = PATHS['curr_pdf_path']
     initial_seg_folder = PATHS['initial_segmentation']
-    all_coordinates, all_row_mappings = extract_alphabets(pdf_path, initial_seg_folder)
+    try:
+        page_nums = requested_page_nums(pdf_path)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    annotated_images_folder = PATHS['annotated_images']
+    cache_key = extraction_cache_key(pdf_path, page_nums) if cache_enabled() else None
+    cached = cache_key and load_cached_extraction(cache_key, initial_seg_folder, annotated_images_folder)
+    if cached:
+        # The cached crops replace whatever a previous lazy extraction recorded
+        discard_lazy_extraction()
+        all_coordinates, all_row_mappings = cached['coordinates'], cached['row_mappings']
+    else:
+        existing_crops = list_png_files(initial_seg_folder)
+        all_coordinates, all_row_mappings = extract_alphabets(pdf_path, initial_seg_folder, page_nums=page_nums)
+        row_images = annotate_pdf_rows(pdf_path, all_row_mappings, all_coordinates, annotated_images_folder)
+        if cache_key:
+            crops = list_png_files(initial_seg_folder) - existing_crops
+            store_extraction(cache_key, all_coordinates, all_row_mappings, crops, row_images, initial_seg_folder,
+                             annotated_images_folder)
+
     save_rows_to_file(all_coordinates, "coordinates")
     save_rows_to_file(all_row_mappings, "row_mapping")
 
-    annotated_images_folder = PATHS['annotated_images']
-    annotate_pdf_rows(pdf_path, all_row_mappings, all_coordinates, annotated_images_folder)
-    
+    row_paths = list_row_paths(annotated_images_folder)
+    return jsonify({
+        "row_paths": row_paths,
+    }), 200
+
+def requested_page_nums(pdf_path):
+    """
+    0-based pages to extract: the request's 1-based start_page / end_page
+    arguments, else the range chosen at /upload, else every page
+    """
+    start_page, end_page = request.args.get('start_page'), request.args.get('end_page')
+    if start_page is None and end_page is None:
+        start_page, end_page = load_page_range()
+    return parse_page_range(start_page, end_page, get_page_count(pdf_path))
+
+def list_png_files(folder):
+    return {filename for filename in list_crops(folder) if filename.endswith('.png')}
+
+def list_row_paths(annotated_images_folder):
     row_paths = []
     for filename in os.listdir(annotated_images_folder):
         if filename.endswith('.png'):
             row_paths.append(filename)
-    return jsonify({
-        "row_paths": row_paths,
-    }), 200
\ No newline at end of file
+    return row_paths
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@initial_rows_blueprint.route('/get_initial_rows/stream', methods=['GET'])
+def stream_initial_rows():
+    """
+    Server-sent events version of /get_initial_rows, takes the same page range.
+
+    Events:
+    - row-image-ready: {page, row, filename} as soon as a row image is saved
+    - page-complete: {page, rows} once every row image of a page is saved
+    - done: {row_paths} after coordinates and row mapping are saved, same as /get_initial_rows
+    - error: {error} if extraction fails
+    """
+    pdf_path = PATHS['curr_pdf_path']
+    initial_seg_folder = PATHS['initial_segmentation']
+    annotated_images_folder = PATHS['annotated_images']
+    try:
+        page_nums = requested_page_nums(pdf_path)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def annotated_pages(cache_key):
+        """(page_num, coordinates, row_mapping, row_images) from the cache, else extracted and cached"""
+        cached = cache_key and load_cached_extraction(cache_key, initial_seg_folder, annotated_images_folder)
+        if cached:
+            discard_lazy_extraction()
+            yield from zip(range(len(cached['coordinates'])), cached['coordinates'], cached['row_mappings'],
+                           cached['row_images'])
+            return
+
+        existing_crops = list_png_files(initial_seg_folder)
+        pages = iter_extract_alphabets(pdf_path, initial_seg_folder, page_nums=page_nums)
+        all_coordinates, all_row_mappings, all_row_images = [], [], []
+        for page_num, coordinates, row_mapping, row_images in iter_annotate_pdf_rows(pdf_path, pages, annotated_images_folder):
+            all_coordinates.append(coordinates)
+            all_row_mappings.append(row_mapping)
+            all_row_images.append(row_images)
+            yield page_num, coordinates, row_mapping, row_images
+
+        if cache_key:
+            crops = list_png_files(initial_seg_folder) - existing_crops
+            store_extraction(cache_key, all_coordinates, all_row_mappings, crops, all_row_images, initial_seg_folder,
+                             annotated_images_folder)
+
+    def generate():
+        all_coordinates = []
+        all_row_mappings = []
+        try:
+            cache_key = extraction_cache_key(pdf_path, page_nums) if cache_enabled() else None
+            for page_num, coordinates, row_mapping, row_images in annotated_pages(cache_key):
+                all_coordinates.append(coordinates)
+                all_row_mappings.append(row_mapping)
+                if page_num not in page_nums:
+                    continue
+
+                rows = [row_num for row_num, _, _ in row_mapping]
+                for filename in row_images:
+                    # row_{page}_R{row}.png
+                    row_num = int(filename[:-len('.png')].split('_R')[-1])
+                    yield sse_event('row-image-ready', {'page': page_num + 1, 'row': row_num, 'filename': filename})
+                yield sse_event('page-complete', {'page': page_num + 1, 'rows': rows})
+
+            save_rows_to_file(all_coordinates, "coordinates")
+            save_rows_to_file(all_row_mappings, "row_mapping")
+            yield sse_event('done', {'row_paths': list_row_paths(annotated_images_folder)})
+        except Exception as e:
+            print(f"Error streaming initial rows: {e}")
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop reverse proxies from buffering the stream
+        'X-Accel-Buffering': 'no',
+    })
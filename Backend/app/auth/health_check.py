@@ -1,4 +1,5 @@
 from flask import jsonify, Blueprint
+from app.services.warmup import get_readiness
 
 health_check_blueprint = Blueprint('health_check', __name__)
 
@@ -27,4 +28,21 @@ def config_check():
         'allowed_origins': ['http://localhost:3000', 'http://164.52.205.176:3000'],
         'backend_url': 'http://164.52.205.176:5000',
         'message': 'Configuration check passed'
-    }), 200
\ No newline at end of file
+    }), 200
+
+@health_check_blueprint.route('/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness endpoint for the load balancer, only 200 once the classifier is warmed up
+    """
+    readiness = get_readiness()
+    if readiness['ready']:
+        return jsonify({
+            'status': 'ready',
+            'warmup_seconds': readiness['warmup_seconds']
+        }), 200
+
+    return jsonify({
+        'status': 'error' if readiness['error'] else 'warming_up',
+        'error': readiness['error']
+    }), 503
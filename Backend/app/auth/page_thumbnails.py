@@ -0,0 +1,28 @@
+from flask import Blueprint, request, jsonify, Response, abort
+from ..config import PATHS
+from app.services.page_selection import get_page_count, render_page_thumbnail, load_page_range, THUMBNAIL_WIDTH
+
+page_thumbnails_blueprint = Blueprint('page_thumbnails', __name__)
+
+@page_thumbnails_blueprint.route('/pdf_pages', methods=['GET'])
+def pdf_pages():
+    """Page count of the uploaded PDF and the page range chosen at /upload (1-based, None for open ends)"""
+    start_page, end_page = load_page_range()
+    return jsonify({
+        "page_count": get_page_count(PATHS['curr_pdf_path']),
+        "start_page": start_page,
+        "end_page": end_page,
+    }), 200
+
+@page_thumbnails_blueprint.route('/page_thumbnail/<int:page>', methods=['GET'])
+def page_thumbnail(page):
+    """Low-resolution PNG of a 1-based page for picking the page range, ?width= in pixels"""
+    pdf_path = PATHS['curr_pdf_path']
+    if not 1 <= page <= get_page_count(pdf_path):
+        return abort(404, description=f"Page not found: {page}")
+
+    width = request.args.get('width', THUMBNAIL_WIDTH, type=int)
+    response = Response(render_page_thumbnail(pdf_path, page - 1, max(1, width)), mimetype='image/png')
+    # Another upload replaces the PDF behind the same URL
+    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    return response
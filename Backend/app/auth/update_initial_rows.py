@@ -4,8 +4,9 @@ import os
 from ..config import PATHS
 from app.services.save_data import load_rows_from_file, save_rows_to_file
 from app.services.copy_image_in_row_range import copy_images_in_row_range
+from app.services.initial_extraction import materialize_crops_in_row_range
 from app.services.save_metadata import save_composition_metadata
-from app.services.mapping import get_row_image_counts
+from app.services.glyph_index import build_glyph_index, count_glyphs_per_row
 from app.services.identifications import get_sam_and_taalis_rows
 
 update_initial_rows_blueprint = Blueprint('update_initial_rows', __name__)
@@ -24,9 +25,11 @@ def update_initial_rows():
     initial_segmentation_folder = PATHS['initial_segmentation']
     annotated_images_folder = PATHS['annotated_images']
 
-    copy_images_in_row_range(initial_segmentation_folder, working_composition_folder, first_row, last_row)
+    if not materialize_crops_in_row_range(working_composition_folder, first_row, last_row, PATHS.get('curr_pdf_path')):
+        copy_images_in_row_range(initial_segmentation_folder, working_composition_folder, first_row, last_row)
+    build_glyph_index(working_composition_folder)
     save_composition_metadata(raag_name, taal_name, lay, source_name=source_name, page_number=page_number)
-    row_image_count = get_row_image_counts(working_composition_folder)
+    row_image_count = count_glyphs_per_row()
     sam_and_taalis_rows = get_sam_and_taalis_rows(row_image_count, taal_name)
     
     metadata = load_rows_from_file("composition_metadata")
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, session, make_response
 import os
 from ..config import PATHS
+from app.services.page_selection import get_page_count, parse_page_range, save_page_range
 
 upload_blueprint = Blueprint('upload', __name__)
 
@@ -24,10 +25,23 @@ def upload_pdf():
         file_path = os.path.join(upload_folder, file.filename)
         
         file.save(file_path)
+
+        # Optional 1-based page range, /get_initial_rows only processes these pages
+        start_page = request.form.get('start_page') or None
+        end_page = request.form.get('end_page') or None
+        try:
+            page_count = get_page_count(file_path)
+            parse_page_range(start_page, end_page, page_count)
+        except (ValueError, RuntimeError) as e:
+            # RuntimeError: fitz could not open the file
+            return jsonify({"error": str(e)}), 400
+
         PATHS['curr_pdf_path'] = file_path
+        save_page_range(start_page and int(start_page), end_page and int(end_page))
         response = make_response(jsonify({
             "message": "File uploaded successfully",
             "file_path": upload_folder,
+            "page_count": page_count,
         }), 200)
         response.headers['Access-Control-Allow-Origin'] = 'http://164.52.205.176:3000'
         response.headers['Access-Control-Allow-Credentials'] = 'true'
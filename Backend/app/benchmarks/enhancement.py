@@ -0,0 +1,147 @@
+"""
+Crop enhancement benchmark.
+
+Times the 'per_crop', 'row' and 'page' enhancement strategies of
+extract_alphabets on a PDF and reports how far each strategy's crops are from
+the per-crop output, both in pixels and at the 32x32 classifier input, as JSON:
+
+    python -m app.benchmarks.enhancement uploads/asawari_3_taal.pdf --strategies per_crop,row,page
+
+Run from the Backend folder. Page rendering and glyph detection are shared by
+every strategy, only crop acquisition is timed.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+
+import fitz
+import numpy as np
+
+from app.services.image_processing import preprocess_array_to_predict
+from app.services.initial_extraction import (
+    acquire_regions,
+    build_row_mapping,
+    detect_glyphs,
+    plan_alphabet_regions,
+    render_page,
+)
+
+
+def load_pages(pdf_path, aspect_ratio_threshold=3):
+    """Rendered pages with the crops extract_alphabets would save on them"""
+    pages = []
+    last_row_number = 0
+    # Empty folder so the crop names do not depend on earlier runs
+    output_folder = tempfile.mkdtemp()
+    pdf_document = fitz.open(pdf_path)
+    for page_num in range(len(pdf_document)):
+        np_page_image = render_page(pdf_document.load_page(page_num))
+        coordinates = detect_glyphs(np_page_image)
+        if not coordinates:
+            continue
+        row_mapping = build_row_mapping(coordinates, aspect_ratio_threshold, last_row_number)
+        last_row_number = row_mapping[-1][0] if row_mapping else last_row_number
+        regions = plan_alphabet_regions(page_num, coordinates, row_mapping, output_folder, aspect_ratio_threshold)
+        pages.append((np_page_image, regions))
+    os.rmdir(output_folder)
+    return pages
+
+
+def run_strategy(pages, enhancement, repeats):
+    """Best wall time over repeats and the crops of the last run"""
+    timings = []
+    crops = {}
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for np_page_image, regions in pages:
+            for filename, crop in acquire_regions(np_page_image, None, regions, 'upscale', enhancement):
+                crops[filename] = crop
+        timings.append(time.perf_counter() - started)
+    return min(timings), crops
+
+
+def pixel_difference(reference, crops):
+    """Absolute difference of every crop against the per-crop reference"""
+    differences = []
+    model_input_differences = []
+    per_crop_means = {}
+    for filename, reference_crop in reference.items():
+        crop = crops[filename]
+        difference = np.abs(reference_crop.astype(np.int16) - crop.astype(np.int16))
+        differences.append(difference.ravel())
+        per_crop_means[filename] = float(difference.mean())
+
+        model_input_difference = np.abs(preprocess_array_to_predict(reference_crop).astype(np.int16)
+                                        - preprocess_array_to_predict(crop).astype(np.int16))
+        model_input_differences.append(model_input_difference.ravel())
+
+    differences = np.concatenate(differences)
+    model_input_differences = np.concatenate(model_input_differences)
+    mse = float(np.mean(differences.astype(np.float64) ** 2))
+    worst = sorted(per_crop_means.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {
+        'mean_abs_diff': round(float(differences.mean()), 3),
+        'p99_abs_diff': int(np.percentile(differences, 99)),
+        'max_abs_diff': int(differences.max()),
+        'pixels_over_32': round(float(np.mean(differences > 32)), 5),
+        'psnr_db': round(10 * np.log10(255 ** 2 / mse), 2) if mse else None,
+        'model_input_mean_abs_diff': round(float(model_input_differences.mean()), 3),
+        'model_input_max_abs_diff': int(model_input_differences.max()),
+        'worst_crops': [{'filename': filename, 'mean_abs_diff': round(value, 3)} for filename, value in worst],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crop enhancement strategies")
+    parser.add_argument('pdf_path', help="PDF to extract glyphs from")
+    parser.add_argument('--strategies', default='per_crop,row,page', help="Comma separated: per_crop, row, page")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs per strategy")
+    parser.add_argument('--output', default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    pages = load_pages(args.pdf_path)
+    crop_count = sum(len(regions) for _, regions in pages)
+
+    # The report compares against the current per-crop output, so it always runs
+    strategies = ['per_crop'] + [s for s in args.strategies.split(',') if s and s != 'per_crop']
+    reference = None
+    results = []
+    for enhancement in strategies:
+        seconds, crops = run_strategy(pages, enhancement, args.repeats)
+        result = {
+            'enhancement': enhancement,
+            'seconds': round(seconds, 3),
+            'crops_per_second': round(crop_count / seconds, 2) if seconds else None,
+        }
+        if reference is None:
+            reference = crops
+        else:
+            result['speedup'] = round(results[0]['seconds'] / seconds, 2) if seconds else None
+            result['difference'] = pixel_difference(reference, crops)
+        print(f"{enhancement}: {result['seconds']}s", flush=True)
+        results.append(result)
+
+    report = {
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+        },
+        'pdf': args.pdf_path,
+        'pages': len(pages),
+        'crops': crop_count,
+        'results': results,
+    }
+
+    report_json = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report_json)
+    print(report_json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Classifier throughput benchmark.
+
+Sweeps batch size, intra-op/inter-op thread counts and inference runtime and
+prints crops/sec, p50/p99 batch latency and peak RSS as JSON:
+
+    python -m app.benchmarks.inference --batch-sizes 1,32,128 --intra-op 1,2,4 --runtimes keras,tflite
+
+Run from the Backend folder. Every configuration runs in a fresh process,
+because TensorFlow only accepts thread settings before it initializes.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import cv2
+import numpy as np
+
+from app.config import PATHS
+
+
+def synthetic_glyphs(count, seed=0):
+    """Random pen strokes on a white 32x32 canvas, shaped like the real crops"""
+    rng = np.random.default_rng(seed)
+    glyphs = np.full((count, 32, 32), 255, dtype=np.uint8)
+    for glyph in glyphs:
+        for _ in range(rng.integers(1, 4)):
+            start = tuple(int(v) for v in rng.integers(4, 28, size=2))
+            end = tuple(int(v) for v in rng.integers(4, 28, size=2))
+            cv2.line(glyph, start, end, 0, int(rng.integers(1, 4)))
+    return glyphs
+
+
+def load_glyphs(source, count):
+    """Preprocessed (N, 32, 32) glyphs from the segmented crops or synthetic ones"""
+    if source == 'segmented':
+        from app.services.model_export import load_crop_batch
+
+        glyphs, _ = load_crop_batch([PATHS['working_composition_segmented']], limit=count)
+        if len(glyphs):
+            # Repeat the available crops up to the requested count
+            return np.resize(glyphs, (count, 32, 32))
+        print(f"No crops in {PATHS['working_composition_segmented']}, using synthetic glyphs")
+    return synthetic_glyphs(count)
+
+
+def _configure_threads(runtime, intra_op, inter_op):
+    cv2.setNumThreads(intra_op)
+    if runtime == 'keras':
+        import tensorflow as tf
+
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+
+def _load_model(runtime, intra_op):
+    from app.services.model_registry import TFLiteClassifier, get_runtime_model_path, load_runtime_model
+
+    model_path = get_runtime_model_path(runtime)
+    if runtime == 'tflite':
+        return TFLiteClassifier(model_path, num_threads=intra_op)
+    return load_runtime_model(runtime, model_path)
+
+
+def run_configuration(runtime, batch_size, intra_op, inter_op, source, crops, repeats):
+    """Benchmark one configuration; runs inside its own process"""
+    _configure_threads(runtime, intra_op, inter_op)
+
+    load_started = time.perf_counter()
+    model = _load_model(runtime, intra_op)
+    load_seconds = time.perf_counter() - load_started
+
+    glyphs = load_glyphs(source, crops)
+    batches = [glyphs[start:start + batch_size] for start in range(0, len(glyphs), batch_size)]
+
+    # Untimed pass so graph construction is not counted as latency
+    model.predict_on_batch(batches[0])
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for batch in batches:
+            batch_started = time.perf_counter()
+            model.predict_on_batch(batch)
+            latencies.append(time.perf_counter() - batch_started)
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'runtime': runtime,
+        'batch_size': batch_size,
+        'intra_op_threads': intra_op,
+        'inter_op_threads': inter_op,
+        'crops': crops * repeats,
+        'crops_per_second': round(crops * repeats / elapsed, 2),
+        'batch_latency_p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'batch_latency_p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+        'model_load_seconds': round(load_seconds, 3),
+        # ru_maxrss is reported in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark swar classifier throughput")
+    parser.add_argument('--source', choices=['segmented', 'synthetic'], default='segmented',
+                        help="Crops from working_composition_segmented or synthetic 32x32 glyphs")
+    parser.add_argument('--crops', type=int, default=1024, help="Crops per timed pass")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed passes per configuration")
+    parser.add_argument('--batch-sizes', type=_int_list, default=[1, 16, 64, 256])
+    parser.add_argument('--intra-op', type=_int_list, default=[1, os.cpu_count() or 1])
+    parser.add_argument('--inter-op', type=_int_list, default=[1])
+    parser.add_argument('--runtimes', default='keras', help="Comma separated: keras, tflite, onnx")
+    parser.add_argument('--output', default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = []
+    for runtime in args.runtimes.split(','):
+        for intra_op in args.intra_op:
+            for inter_op in args.inter_op:
+                for batch_size in args.batch_sizes:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                        future = executor.submit(run_configuration, runtime, batch_size, intra_op, inter_op,
+                                                 args.source, args.crops, args.repeats)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = {
+                                'runtime': runtime,
+                                'batch_size': batch_size,
+                                'intra_op_threads': intra_op,
+                                'inter_op_threads': inter_op,
+                                'error': str(e),
+                            }
+                    print(f"{runtime} batch={batch_size} intra={intra_op} inter={inter_op}: "
+                          f"{result.get('crops_per_second', result.get('error'))}", flush=True)
+                    results.append(result)
+
+    report = {
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+        },
+        'model': PATHS['model'],
+        'source': args.source,
+        'results': results,
+    }
+
+    report_json = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report_json)
+    print(report_json)
+
+
+if __name__ == '__main__':
+    main()
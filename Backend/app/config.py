@@ -4,5 +4,105 @@ PATHS = {
     'working_composition': 'outputs/working_composition',
     'working_composition_segmented': 'outputs/working_composition_segmented',
     'annotated_images': 'outputs/annotated',
+    # Per-job index of the working composition's glyphs (see services/glyph_index.py)
+    'glyph_index': 'outputs/glyph_index.sqlite',
+    # Packed crop store of the current job, crop_store.bin and crop_store.idx (see services/crop_store.py)
+    'crop_store': 'outputs/crop_store',
+    # Crops recorded by a lazy extraction of the current job, saved once the row range is chosen
+    'lazy_extraction': 'outputs/lazy_extraction',
     'model': 'model/music_model_2025_v1.h5',
-}
\ No newline at end of file
+    'model_tflite': 'model/music_model_2025_v1.tflite',
+    'model_onnx': 'model/music_model_2025_v1.onnx',
+    'classes': 'classes.json',
+    # Extraction results by PDF hash and settings when EXTRACTION['cache'] is on (see services/extraction_cache.py)
+    'extraction_cache': 'extraction_cache',
+    # Rendered pages by PDF hash, page and zoom when EXTRACTION['page_raster_cache'] is on (see services/page_rasters.py)
+    'page_rasters': 'page_rasters',
+}
+
+INFERENCE = {
+    # 'keras', or a TensorFlow-free export: 'tflite' or 'onnx' (see services/model_export.py)
+    'runtime': 'keras',
+    # Rank of the ONNX graph input: 3 for (N, 32, 32), 4 for (N, 32, 32, 1)
+    'onnx_input_rank': 3,
+    # Reload the classifier when the model file on disk changes
+    'hot_swap_model': False,
+    # Classify all crops of a composition in large batches instead of one by one
+    'batched': True,
+    'batch_size': 64,
+    # Reuse predictions for identical 32x32 inputs (keyed by content and model version)
+    'prediction_cache': True,
+    'prediction_cache_size': 4096,
+    # SQLite file of a persistent tier that survives restarts (e.g. 'prediction_cache.sqlite3'),
+    # None keeps the cache in memory only
+    'prediction_cache_path': None,
+    # Unix socket of the shared inference server (services/inference_server.py), None runs the model in-process
+    'server_address': None,
+    # Shared secret of the inference server, from the SWARLIPI_INFERENCE_AUTHKEY environment variable
+    # or else this file (readable only by the app's user). The server will not start without one.
+    'server_authkey_file': None,
+    # Requests arriving within this window are merged into one forward pass
+    'server_batch_window_ms': 5,
+    'server_max_batch': 256,
+    # Load the model and run dummy batches at app start, /ready reports 503 until done
+    'warmup_on_boot': True,
+    # None warms up at 1 and INFERENCE['batch_size']
+    'warmup_batch_sizes': None,
+    'warmup_retry_seconds': 5,
+}
+
+PIPELINE = {
+    # Stream finished subgroups to the classifier while later ones are still segmented
+    'overlap_final_rows': False,
+    # Segmented subgroups allowed to wait for the classifier
+    'final_rows_queue_size': 4,
+}
+
+CPU_BUDGET = {
+    # Cores shared by OpenCV, TensorFlow and the worker pools, None uses every available core
+    'total_cores': None,
+    # Explicit per-consumer settings, None derives them from total_cores
+    'opencv_threads': None,
+    'tf_intra_op_threads': None,
+    'tf_inter_op_threads': None,
+    'pool_workers': None,
+}
+
+EXTRACTION = {
+    # Pages processed in parallel by /get_initial_rows, 1 runs sequentially, None uses CPU_BUDGET['pool_workers']
+    'workers': 1,
+    # 'contours' (findContours + boundingRect) or 'components' (connectedComponentsWithStats),
+    # both find the same glyphs in the same order
+    'glyph_detection': 'contours',
+    # Group glyphs by the text layer of born-digital pages, their boxes snapped to the raster
+    # glyphs they cover. Scanned pages keep the raster path
+    'vector_text': False,
+    # 'upscale' enlarges 72 dpi crops and sharpens/denoises them, 'render' re-renders
+    # each glyph's clip rectangle at render_zoom from the PDF (better for vector PDFs).
+    # Crops are 3x the page resolution either way, other zooms are resampled to 3x
+    'crop_mode': 'upscale',
+    'render_zoom': 3,
+    # Where 'upscale' crops are enlarged, sharpened and denoised: 'per_crop', once per
+    # 'row' band or once per 'page' (see app/benchmarks/enhancement.py for the trade-off)
+    'enhancement': 'per_crop',
+    # Only record bounding boxes at /get_initial_rows, crops of the chosen row range
+    # are acquired by /update_initial_rows
+    'lazy': False,
+    # Reuse the crops, row images and row mappings of a PDF extracted before with the
+    # same settings from PATHS['extraction_cache'], evicting least recently used entries past
+    # cache_max_mb. Off by default, it keeps up to cache_max_mb on disk
+    'cache': False,
+    'cache_max_mb': 2048,
+    # Append glyph and segment crops to one memory-mapped file per job instead of writing a
+    # PNG each, /fetch_image encodes the ones the frontend asks for
+    'crop_store': False,
+    # Only record each glyph crop's page, box and enhancement, its pixels are cut from the
+    # page when a stage reads it and kept in an LRU of virtual_crop_cache_size crops
+    'virtual_crops': False,
+    'virtual_crop_cache_size': 1024,
+    # Render each page once per PDF into a memory-mapped raster cache shared by extraction,
+    # its page workers, annotation and later re-cropping, kept in PATHS['page_rasters'] and evicting
+    # least recently used PDFs past page_raster_cache_max_mb. Off by default, it keeps up to that on disk
+    'page_raster_cache': False,
+    'page_raster_cache_max_mb': 1024,
+}
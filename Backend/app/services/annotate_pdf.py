@@ -181,6 +181,7 @@ from PIL import Image
 import os.path
 import sys
 from app.services.save_data import load_rows_from_file
+from app.services.page_rasters import load_page_raster
 sys.path.append(os.path.join(os.path.dirname(__file__)))
 
 def annotate_pdf_rows(pdf_path, all_row_mappings, all_coordinates, output_folder, padding=10):
@@ -193,6 +194,27 @@ def annotate_pdf_rows(pdf_path, all_row_mappings, all_coordinates, output_folder
     - all_coordinates: List of coordinates for each page
     - output_folder: Folder to save row images
     - padding: Padding to add to each row image (default: 10)
+    
+    Returns the row image filenames of every page.
+    """
+    pages = zip(range(len(all_row_mappings)), all_coordinates, all_row_mappings)
+    row_images = [row_image_filenames for _, _, _, row_image_filenames in iter_annotate_pdf_rows(pdf_path, pages, output_folder, padding)]
+    
+    print(f"Extracted rows saved to {output_folder}")
+    return row_images
+
+def iter_annotate_pdf_rows(pdf_path, pages, output_folder, padding=10):
+    """
+    Generator version of annotate_pdf_rows.
+    
+    Parameters:
+    - pdf_path: Path to the PDF file
+    - pages: Iterable of (page_num, coordinates, row_mapping), e.g. iter_extract_alphabets,
+             consumed lazily so rows are saved as soon as their page is extracted
+    - output_folder: Folder to save row images
+    - padding: Padding to add to each row image (default: 10)
+    
+    Yields (page_num, coordinates, row_mapping, row_image_filenames) for every page.
     """
     
     if not os.path.exists(output_folder):
@@ -200,68 +222,71 @@ def annotate_pdf_rows(pdf_path, all_row_mappings, all_coordinates, output_folder
 
     pdf_document = fitz.open(pdf_path)
     
-    for page_num in range(len(pdf_document)):
+    for page_num, coordinates, row_mapping in pages:
         # Skip pages with no row mappings
-        if page_num >= len(all_row_mappings) or not all_row_mappings[page_num]:
+        if page_num >= len(pdf_document) or not row_mapping:
+            yield page_num, coordinates, row_mapping, []
             continue
         
-        # Get page image
+        # Get page image, rendered once by extraction
         page = pdf_document.load_page(page_num)
-        page_image = page.get_pixmap()
-        np_page_image = np.frombuffer(page_image.samples, dtype=np.uint8).reshape(
-            (page_image.height, page_image.width, page_image.n)
-        )
+        np_page_image = load_page_raster(page)
         
-        # Get row mapping for the current page
-        row_mapping = all_row_mappings[page_num]
+        row_image_filenames = annotate_page_rows(np_page_image, page_num, row_mapping, output_folder, padding)
+        yield page_num, coordinates, row_mapping, row_image_filenames
+
+def annotate_page_rows(np_page_image, page_num, row_mapping, output_folder, padding=10):
+    """Save the row images of one rendered page and return their filenames"""
+    row_image_filenames = []
+    
+    # Sort row_mapping by lower_limit to ensure proper order
+    row_mapping = sorted(row_mapping, key=lambda x: x[1])
+    
+    for i, (row_num, lower_limit, upper_limit) in enumerate(row_mapping):
+        # Calculate the height of the row
+        row_height = upper_limit - lower_limit
         
-        # Sort row_mapping by lower_limit to ensure proper order
-        row_mapping = sorted(row_mapping, key=lambda x: x[1])
+        # Calculate the ending y coordinate
+        end_y = lower_limit + 2 * row_height
         
-        for i, (row_num, lower_limit, upper_limit) in enumerate(row_mapping):
-            # Calculate the height of the row
-            row_height = upper_limit - lower_limit
-            
-            # Calculate the ending y coordinate
-            end_y = lower_limit + 2 * row_height
-            
-            # Ensure the end_y does not exceed the image height
-            end_y = min(end_y, np_page_image.shape[0])
-            
-            # Check if the next row exists and adjust end_y to avoid overlap
-            if i < len(row_mapping) - 1:
-                next_lower_limit = row_mapping[i + 1][1]
-                next_upper_limit = row_mapping[i + 1][2]
-                if end_y > next_lower_limit and next_upper_limit - next_lower_limit > 1:
-                    end_y = next_lower_limit
-            
-            # Skip if the row is empty or invalid
-            if lower_limit >= end_y:
-                print(f"Skipping empty row {row_num}: lower_limit ({lower_limit}) >= end_y ({end_y})")
-                continue
-            
-            # Extract the row from the page image
-            row_image = np_page_image[lower_limit:end_y, :]
-            
-            # Convert RGB to grayscale if necessary
-            if len(row_image.shape) == 3:  # If RGB, convert to grayscale
-                row_image = cv2.cvtColor(row_image, cv2.COLOR_RGB2GRAY)
-            
-            # Ensure the image is 2D (grayscale)
-            if len(row_image.shape) != 2:
-                print(f"Unexpected image shape: {row_image.shape}, skipping row {row_num}")
-                continue
-            
-            # Add padding to the row image
-            padded_row_image = np.pad(row_image, ((padding, padding), (0, 0)), mode='constant', constant_values=255)
-            
-            # Convert to PIL image
-            pil_row_image = Image.fromarray(padded_row_image)
-            
-            # Save the row image
-            row_image_filename = os.path.join(output_folder, f"row_{page_num+1}_R{row_num}.png")
-            pil_row_image.save(row_image_filename)
-            
-            print(f"Saved row {row_num} from page {page_num+1} to {row_image_filename}")
+        # Ensure the end_y does not exceed the image height
+        end_y = min(end_y, np_page_image.shape[0])
+        
+        # Check if the next row exists and adjust end_y to avoid overlap
+        if i < len(row_mapping) - 1:
+            next_lower_limit = row_mapping[i + 1][1]
+            next_upper_limit = row_mapping[i + 1][2]
+            if end_y > next_lower_limit and next_upper_limit - next_lower_limit > 1:
+                end_y = next_lower_limit
+        
+        # Skip if the row is empty or invalid
+        if lower_limit >= end_y:
+            print(f"Skipping empty row {row_num}: lower_limit ({lower_limit}) >= end_y ({end_y})")
+            continue
+        
+        # Extract the row from the page image
+        row_image = np_page_image[lower_limit:end_y, :]
+        
+        # Convert RGB to grayscale if necessary
+        if len(row_image.shape) == 3:  # If RGB, convert to grayscale
+            row_image = cv2.cvtColor(row_image, cv2.COLOR_RGB2GRAY)
+        
+        # Ensure the image is 2D (grayscale)
+        if len(row_image.shape) != 2:
+            print(f"Unexpected image shape: {row_image.shape}, skipping row {row_num}")
+            continue
+        
+        # Add padding to the row image
+        padded_row_image = np.pad(row_image, ((padding, padding), (0, 0)), mode='constant', constant_values=255)
+        
+        # Convert to PIL image
+        pil_row_image = Image.fromarray(padded_row_image)
+        
+        # Save the row image
+        row_image_filename = os.path.join(output_folder, f"row_{page_num+1}_R{row_num}.png")
+        pil_row_image.save(row_image_filename)
+        row_image_filenames.append(os.path.basename(row_image_filename))
+        
+        print(f"Saved row {row_num} from page {page_num+1} to {row_image_filename}")
     
-    print(f"Extracted rows saved to {output_folder}")
\ No newline at end of file
+    return row_image_filenames
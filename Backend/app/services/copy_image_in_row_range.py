@@ -1,4 +1,5 @@
-import os, re, shutil
+import os, re
+from app.services.crop_store import list_crops, copy_crop
 
 def get_image_details_with_row(filename):
     pattern = r'(\d+)_row(\d+)_x(\d+)_y(\d+)_w(\d+)_h(\d+)'
@@ -17,9 +18,9 @@ def copy_images_in_row_range(input_folder, output_folder, first_row, last_row):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
-    for filename in os.listdir(input_folder):
+    for filename in list_crops(input_folder):
         details = get_image_details_with_row(filename)
         if details:
             _, row_num, _, _, _, _ = details
             if first_row <= row_num <= last_row:
-                shutil.copy(os.path.join(input_folder, filename), os.path.join(output_folder, filename))
+                copy_crop(os.path.join(input_folder, filename), os.path.join(output_folder, filename))
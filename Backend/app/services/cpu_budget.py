@@ -0,0 +1,87 @@
+import os
+
+import cv2
+
+from app.config import CPU_BUDGET, INFERENCE
+
+# Effective settings once configure_cpu_budget has run
+_EFFECTIVE = {}
+
+
+def available_cores():
+    """Cores this process may run on (respects taskset / container cpusets)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def compute_cpu_budget():
+    """
+    Split the core budget between OpenCV, TensorFlow and the worker pools.
+
+    Unset values in CPU_BUDGET are derived from 'total_cores' (or the
+    SWARLIPI_CPU_CORES environment variable, or every available core):
+    OpenCV and TensorFlow run at the same time in the /final_rows pipeline,
+    so each gets half, and process pool workers run single-threaded OpenCV
+    so the pool gets the whole budget.
+    """
+    total = CPU_BUDGET['total_cores'] or int(os.environ.get('SWARLIPI_CPU_CORES', 0)) or available_cores()
+    half = max(1, total // 2)
+
+    def pick(name, default):
+        value = CPU_BUDGET[name]
+        return max(1, int(value)) if value else default
+
+    return {
+        'total_cores': total,
+        'opencv_threads': pick('opencv_threads', max(1, total - half)),
+        'tf_intra_op_threads': pick('tf_intra_op_threads', half),
+        'tf_inter_op_threads': pick('tf_inter_op_threads', 1 if total < 4 else 2),
+        'pool_workers': pick('pool_workers', total),
+    }
+
+
+def _configure_tensorflow(budget):
+    """Apply the TensorFlow thread pools, which only works before TF initializes"""
+    if INFERENCE['server_address']:
+        return 'not used, inference runs in the shared inference server'
+    if INFERENCE['runtime'] == 'tflite':
+        return 'TFLite interpreter uses tf_intra_op_threads'
+    if INFERENCE['runtime'] == 'onnx':
+        return 'not used, cv2.dnn uses opencv_threads'
+
+    import tensorflow as tf
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(budget['tf_intra_op_threads'])
+        tf.config.threading.set_inter_op_parallelism_threads(budget['tf_inter_op_threads'])
+    except RuntimeError as e:
+        return f"unchanged, TensorFlow already initialized ({e})"
+    return 'applied'
+
+
+def configure_cpu_budget():
+    """Apply the CPU budget to OpenCV and TensorFlow and log the effective settings"""
+    budget = compute_cpu_budget()
+
+    cv2.setNumThreads(budget['opencv_threads'])
+    tf_status = _configure_tensorflow(budget)
+
+    _EFFECTIVE.clear()
+    _EFFECTIVE.update(budget)
+    _EFFECTIVE['opencv_effective_threads'] = cv2.getNumThreads()
+    _EFFECTIVE['tensorflow'] = tf_status
+
+    print("CPU budget:", _EFFECTIVE)
+    return dict(_EFFECTIVE)
+
+
+def get_cpu_budget():
+    """Return the effective CPU budget, computing it if it was never configured"""
+    return dict(_EFFECTIVE) if _EFFECTIVE else compute_cpu_budget()
+
+
+def configure_pool_worker():
+    """Initializer for process pool workers: single-threaded OpenCV per worker"""
+    cv2.setNumThreads(1)
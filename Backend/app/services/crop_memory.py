@@ -0,0 +1,66 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# Crops produced by the segmentation stages of the current job, keyed by the
+# path they were written to. The classifier reads from here before disk.
+_CROPS = {}
+_CROPS_LOCK = threading.Lock()
+
+
+def _key(image_path):
+    return os.path.normpath(image_path)
+
+
+def remember_crop(image_path, image):
+    """Keep the pixels of a crop that was just written to image_path"""
+    if image is None:
+        return
+    with _CROPS_LOCK:
+        _CROPS[_key(image_path)] = image
+
+
+def recall_crop(image_path):
+    """Return the in-memory pixels for image_path, or None if not held"""
+    with _CROPS_LOCK:
+        return _CROPS.get(_key(image_path))
+
+
+def forget_crops():
+    """Release every crop held for the current job"""
+    with _CROPS_LOCK:
+        _CROPS.clear()
+
+
+# Weights of libpng's rgb_to_gray, which cv2.imread's PNG decoder sets to 0.299 / 0.587 for
+# IMREAD_GRAYSCALE: fixed point in 1/32768ths, blue gets the remainder, sums are truncated
+_PNG_GREY_SHIFT = 15
+_PNG_GREY_WEIGHTS = np.array([3737, 19234, 9797], dtype=np.uint32)  # B, G, R
+
+
+def decode_like_imread(image, flags=cv2.IMREAD_COLOR):
+    """
+    Pixels of an 8-bit crop exactly as cv2.imread(path, flags) returns them
+    once it was written as a PNG. Colour to grey conversion is the PNG
+    decoder's, not cv2.cvtColor's (they round differently and the classifier
+    sees it).
+    """
+    if image is None or flags == cv2.IMREAD_UNCHANGED:
+        return image
+    channels = 1 if image.ndim == 2 else image.shape[2]
+
+    if flags == cv2.IMREAD_GRAYSCALE:
+        if channels == 1:
+            return image.reshape(image.shape[:2])
+        # The decoder drops alpha without blending
+        grey = image[:, :, :3].astype(np.uint32) @ _PNG_GREY_WEIGHTS
+        return (grey >> _PNG_GREY_SHIFT).astype(np.uint8)
+
+    if flags == cv2.IMREAD_COLOR:
+        if channels == 1:
+            return cv2.cvtColor(image.reshape(image.shape[:2]), cv2.COLOR_GRAY2BGR)
+        return image[:, :, :3] if channels == 4 else image
+
+    raise ValueError(f"Unsupported imread flags: {flags}")
@@ -0,0 +1,248 @@
+import json
+import os
+import mmap
+import shutil
+import threading
+
+import cv2
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows, single-process development only
+    fcntl = None
+
+from app.config import EXTRACTION, PATHS
+from app.services.crop_memory import recall_crop, decode_like_imread
+
+# Packed store of the current job's glyph crops: raw pixels appended to one
+# blob file (crop_store.bin) plus an append-only table (crop_store.idx) with
+# one JSON line per crop: [path, offset, shape, dtype], or [path, recipe] for a
+# virtual crop that is cut from its page when read (see virtual_crops.py). A
+# later line for the same path replaces the earlier one, [path] alone removes
+# it, and copying or renaming a crop only appends lines pointing at the same
+# pixels or recipe. Readers map the
+# blob and get numpy views, PNGs are only encoded when the frontend fetches a crop.
+_STORE = {
+    'inode': None,
+    'table': {},
+    'table_position': 0,
+    'mmap': None,
+}
+_STORE_LOCK = threading.Lock()
+
+
+def crop_store_enabled(crop_store=None):
+    return EXTRACTION['crop_store'] if crop_store is None else crop_store
+
+
+def _store_paths():
+    return f"{PATHS['crop_store']}.bin", f"{PATHS['crop_store']}.idx"
+
+
+def _key(image_path):
+    return os.path.normpath(image_path)
+
+
+def _append(lines, image=None):
+    """Append the pixels of image (if any) and table lines, under an exclusive lock for pool workers"""
+    blob_path, table_path = _store_paths()
+    os.makedirs(os.path.dirname(blob_path) or '.', exist_ok=True)
+    with open(table_path, 'a') as table_file:
+        if fcntl is not None:
+            fcntl.flock(table_file, fcntl.LOCK_EX)
+        try:
+            offset = None
+            if image is not None:
+                with open(blob_path, 'ab') as blob_file:
+                    offset = blob_file.seek(0, os.SEEK_END)
+                    blob_file.write(image.tobytes())
+            table_file.write(''.join(json.dumps(line(offset)) + '\n' for line in lines))
+            table_file.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(table_file, fcntl.LOCK_UN)
+
+
+def _forget_virtual_crops():
+    # A new job reuses crop paths, pixels cut for the previous one must not be served
+    from app.services.virtual_crops import forget_virtual_crops
+    forget_virtual_crops()
+
+
+def _refresh():
+    """Read table lines appended since the last call, starting over when the store was deleted or replaced"""
+    blob_path, table_path = _store_paths()
+    try:
+        stat = os.stat(table_path)
+    except FileNotFoundError:
+        if _STORE['inode'] is not None:
+            _forget_virtual_crops()
+        _STORE.update(inode=None, table={}, table_position=0, mmap=None)
+        return
+
+    if stat.st_ino != _STORE['inode'] or stat.st_size < _STORE['table_position']:
+        if _STORE['inode'] is not None:
+            _forget_virtual_crops()
+        _STORE.update(inode=stat.st_ino, table={}, table_position=0, mmap=None)
+    if stat.st_size == _STORE['table_position']:
+        return
+
+    with open(table_path, 'r') as table_file:
+        table_file.seek(_STORE['table_position'])
+        for line in table_file:
+            # A line still being written by another process is read next time
+            if not line.endswith('\n'):
+                break
+            path, *entry = json.loads(line)
+            if not entry:
+                _STORE['table'].pop(path, None)
+            else:
+                if len(entry) == 3:
+                    offset, shape, dtype = entry
+                    entry = (offset, tuple(shape), dtype)
+                _STORE['table'][path] = tuple(entry)
+            _STORE['table_position'] += len(line.encode())
+
+
+def _view(offset, shape, dtype):
+    """Read-only numpy view of a crop's pixels in the mapped blob"""
+    size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if _STORE['mmap'] is None or len(_STORE['mmap']) < offset + size:
+        # Views into the previous mapping keep it alive until they are released
+        with open(_store_paths()[0], 'rb') as blob_file:
+            _STORE['mmap'] = mmap.mmap(blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(_STORE['mmap'], dtype=dtype, count=int(np.prod(shape)), offset=offset).reshape(shape)
+
+
+def store_crop(image_path, image, crop_store=None):
+    """Append a crop to the store, returns False when the store is off and the caller writes the PNG"""
+    if not crop_store_enabled(crop_store):
+        return False
+    image = np.ascontiguousarray(image)
+    _append([lambda offset: [_key(image_path), offset, list(image.shape), image.dtype.str]], image)
+    return True
+
+
+def virtual_crops_enabled(virtual_crops=None):
+    return EXTRACTION['virtual_crops'] if virtual_crops is None else virtual_crops
+
+
+def store_virtual_crops(output_folder, pdf_path, page_num, regions, crop_mode, enhancement, bands):
+    """
+    Record regions from plan_alphabet_regions as virtual crops of page_num, no
+    pixels are produced. bands are the page's plan_enhancement_bands.
+    """
+    lines = []
+    for region in regions:
+        image_path = _key(os.path.join(output_folder, region[0]))
+        band = bands.get(region[0])
+        recipe = {
+            'pdf_path': pdf_path,
+            'page': page_num,
+            # The region under its first path, aliases made by copy_crop share its pixels
+            'region': [image_path] + list(region[1:]),
+            'crop_mode': crop_mode,
+            'enhancement': enhancement,
+            # Enhanced band the crop is sliced out of, None when it is enhanced on its own
+            'band': None if band is None else list(band),
+        }
+        lines.append(lambda _, image_path=image_path, recipe=recipe: [image_path, recipe])
+    _append(lines)
+
+
+def write_crop(image_path, image, crop_store=None):
+    """Save a crop to the store, or as an image file when the store is off"""
+    if not store_crop(image_path, image, crop_store):
+        cv2.imwrite(image_path, image)
+
+
+def load_stored_crop(image_path):
+    """Pixels of a stored or virtual crop as a read-only array, None if the store does not hold it"""
+    with _STORE_LOCK:
+        _refresh()
+        entry = _STORE['table'].get(_key(image_path))
+        if entry is None:
+            return None
+        if len(entry) == 3:
+            return _view(*entry)
+
+        recipe, = entry
+
+    # Cut from its page outside the lock, stored crops stay readable meanwhile
+    from app.services.virtual_crops import materialize_virtual_crop
+    return materialize_virtual_crop(recipe)
+
+
+def read_crop(image_path, flags=cv2.IMREAD_COLOR):
+    """
+    Pixels of a crop like cv2.imread(image_path, flags): from the pixels a
+    stage of this job still holds, else the packed store, else the file.
+    """
+    image = recall_crop(image_path)
+    if image is None:
+        image = load_stored_crop(image_path)
+    if image is None:
+        return cv2.imread(image_path, flags)
+    # Converted the way the PNG decoder would, the classifier must see the same pixels
+    return decode_like_imread(image, flags)
+
+
+def list_crops(folder):
+    """Filenames of the crops in folder, on disk or in the store"""
+    filenames = set(os.listdir(folder)) if os.path.exists(folder) else set()
+    folder = _key(folder)
+    with _STORE_LOCK:
+        _refresh()
+        filenames.update(os.path.basename(path) for path in _STORE['table'] if os.path.dirname(path) == folder)
+    return filenames
+
+
+def copy_crop(source_path, destination_path):
+    """Copy a crop, a stored one by recording its pixels under the new path too"""
+    with _STORE_LOCK:
+        _refresh()
+        entry = _STORE['table'].get(_key(source_path))
+    if entry is None:
+        os.makedirs(os.path.dirname(destination_path) or '.', exist_ok=True)
+        shutil.copyfile(source_path, destination_path)
+        return
+    # Pixels or recipe are shared, tuples are written as JSON lists
+    _append([lambda _: [_key(destination_path), *entry]])
+
+
+def rename_crop(source_path, destination_path):
+    """Rename a crop like os.rename, a stored one by moving its table entry"""
+    with _STORE_LOCK:
+        _refresh()
+        entry = _STORE['table'].get(_key(source_path))
+    if entry is None:
+        os.rename(source_path, destination_path)
+        return
+    _append([lambda _: [_key(destination_path), *entry], lambda _: [_key(source_path)]])
+
+
+def export_crop(image_path, destination_path):
+    """Write a crop as an image file at destination_path, wherever it is held"""
+    image = load_stored_crop(image_path)
+    if image is None:
+        shutil.copyfile(image_path, destination_path)
+    else:
+        cv2.imwrite(destination_path, image)
+
+
+def import_crop(source_path, image_path, crop_store=None):
+    """Bring an image file in as the crop at image_path (into the store when it is on)"""
+    if crop_store_enabled(crop_store):
+        store_crop(image_path, cv2.imread(source_path, cv2.IMREAD_UNCHANGED), crop_store)
+    else:
+        shutil.copyfile(source_path, image_path)
+
+
+def encode_crop_png(image_path):
+    """PNG bytes of a stored crop for /fetch_image, None if the store does not hold it"""
+    image = load_stored_crop(image_path)
+    if image is None:
+        return None
+    ok, png = cv2.imencode('.png', image)
+    return png.tobytes() if ok else None
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from app.config import EXTRACTION, PATHS
+from app.services.crop_store import list_crops, export_crop, import_crop
+
+# Content-addressed cache of /get_initial_rows results. An entry is a folder
+# named by the hash of the PDF bytes and every extraction setting, holding
+# the coordinates and row mappings (entry.json), the glyph crops (crops/) and
+# the annotated row images (annotated/). Entries are least recently used
+# first out once the cache grows past EXTRACTION['cache_max_mb'].
+ENTRY_FILE = "entry.json"
+_CACHE_LOCK = threading.Lock()
+
+
+def cache_enabled():
+    # Lazy extraction and virtual crops save no crops, there is nothing worth caching
+    return (bool(EXTRACTION['cache'] and PATHS.get('extraction_cache'))
+            and not EXTRACTION['lazy'] and not EXTRACTION['virtual_crops'])
+
+
+def hash_pdf(pdf_path):
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extraction_cache_key(pdf_path, page_nums, aspect_ratio_threshold=3, padding=10):
+    """SHA-256 of the PDF plus every setting that changes the extracted crops or row images"""
+    params = {
+        'aspect_ratio_threshold': aspect_ratio_threshold,
+        'pages': list(page_nums),
+        'padding': padding,
+        'glyph_detection': EXTRACTION['glyph_detection'],
+        'vector_text': EXTRACTION['vector_text'],
+        'crop_mode': EXTRACTION['crop_mode'],
+        'render_zoom': EXTRACTION['render_zoom'],
+        'enhancement': EXTRACTION['enhancement'],
+    }
+    digest = hashlib.sha256(hash_pdf(pdf_path).encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def _entry_folder(key):
+    return os.path.join(PATHS['extraction_cache'], key)
+
+
+def _copy_files(filenames, source_folder, destination_folder):
+    os.makedirs(destination_folder, exist_ok=True)
+    for filename in filenames:
+        shutil.copyfile(os.path.join(source_folder, filename), os.path.join(destination_folder, filename))
+
+
+def load_cached_extraction(key, output_folder, annotated_folder):
+    """
+    Restore a cached extraction into output_folder and annotated_folder.
+
+    Returns the cache entry (coordinates, row_mappings, crops, row_images with
+    the row image filenames of every page) or None on a miss. A hit whose crop
+    names are already taken in output_folder counts as a miss, extraction would
+    have named them differently.
+    """
+    entry_folder = _entry_folder(key)
+    entry_path = os.path.join(entry_folder, ENTRY_FILE)
+    with _CACHE_LOCK:
+        if not os.path.exists(entry_path):
+            return None
+        with open(entry_path, 'r') as f:
+            entry = json.load(f)
+        # Mark as recently used
+        os.utime(entry_path)
+
+    existing_crops = list_crops(output_folder)
+    if any(filename in existing_crops for filename in entry['crops']):
+        return None
+
+    os.makedirs(output_folder, exist_ok=True)
+    for filename in entry['crops']:
+        import_crop(os.path.join(entry_folder, 'crops', filename), os.path.join(output_folder, filename))
+    _copy_files([filename for filenames in entry['row_images'] for filename in filenames],
+                os.path.join(entry_folder, 'annotated'), annotated_folder)
+
+    # JSON turned the tuples into lists
+    entry['coordinates'] = [[tuple(box) for box in coordinates] for coordinates in entry['coordinates']]
+    entry['row_mappings'] = [[tuple(row) for row in row_mapping] for row_mapping in entry['row_mappings']]
+    print(f"Extraction cache hit {key[:12]}: {len(entry['crops'])} crops")
+    return entry
+
+
+def store_extraction(key, all_coordinates, all_row_mappings, crops, row_images, output_folder, annotated_folder):
+    """
+    Add an extraction to the cache.
+
+    crops are the crop filenames this extraction saved in output_folder,
+    row_images the annotated row filenames of every page. The entry is built
+    in a temporary folder and renamed into place, so readers never see half
+    an entry.
+    """
+    cache_folder = PATHS['extraction_cache']
+    entry_folder = _entry_folder(key)
+    if os.path.exists(entry_folder):
+        return
+
+    temp_folder = f"{entry_folder}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        os.makedirs(os.path.join(temp_folder, 'crops'))
+        for filename in crops:
+            # Crops in the packed store are written out as PNGs
+            export_crop(os.path.join(output_folder, filename), os.path.join(temp_folder, 'crops', filename))
+        _copy_files([filename for filenames in row_images for filename in filenames],
+                    annotated_folder, os.path.join(temp_folder, 'annotated'))
+        entry = {
+            'coordinates': all_coordinates,
+            'row_mappings': all_row_mappings,
+            'crops': sorted(crops),
+            'row_images': row_images,
+        }
+        with open(os.path.join(temp_folder, ENTRY_FILE), 'w') as f:
+            json.dump(entry, f)
+
+        with _CACHE_LOCK:
+            if os.path.exists(entry_folder):
+                return
+            os.rename(temp_folder, entry_folder)
+            evict_extraction_cache(cache_folder, keep=key)
+    except OSError as e:
+        # A full disk or a concurrent writer only costs the cache entry
+        print(f"Could not cache extraction {key[:12]}: {e}")
+    finally:
+        if os.path.exists(temp_folder):
+            shutil.rmtree(temp_folder, ignore_errors=True)
+
+
+def folder_size(folder):
+    size = 0
+    for entry in os.scandir(folder):
+        size += folder_size(entry.path) if entry.is_dir() else entry.stat().st_size
+    return size
+
+
+def evict_extraction_cache(cache_folder, keep=None):
+    """Remove least recently used entries until the cache fits in EXTRACTION['cache_max_mb']"""
+    entries = []
+    for entry in os.scandir(cache_folder):
+        entry_path = os.path.join(entry.path, ENTRY_FILE)
+        # Skips temporary folders of entries still being written
+        if not entry.is_dir() or not os.path.exists(entry_path):
+            continue
+        entries.append((os.path.getmtime(entry_path), folder_size(entry.path), entry.name))
+
+    total = sum(size for _, size, _ in entries)
+    max_bytes = EXTRACTION['cache_max_mb'] * 1024 * 1024
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_folder, key), ignore_errors=True)
+        total -= size
+        print(f"Evicted extraction cache entry {key[:12]}")
@@ -1,20 +1,4 @@
 import os
-import shutil
-from filename_utils import get_image_details_with_row
-
-def copy_images_in_row_range(input_folder, output_folder, first_row, last_row):
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-
-    for filename in os.listdir(input_folder):
-        details = get_image_details_with_row(filename)
-        if details:
-            _, row_num, _, _, _, _ = details
-            if first_row <= row_num <= last_row:
-                shutil.copy(os.path.join(input_folder, filename), os.path.join(output_folder, filename))
-
-# ----------------------------------------------------------------------------------------------------------
-
 import numpy as np
 from save_and_load import load_row_categories
 from modifications import pad_lists
@@ -214,8 +198,13 @@ def generate_lists_in_subgroups(subgroup_ranges, row_col_images, beat_count):
     Returns:
         dict: A dictionary containing processed results for each subgroup.
     """
-    subgroup_results = {}
+    return dict(iter_lists_in_subgroups(subgroup_ranges, row_col_images, beat_count))
 
+def iter_lists_in_subgroups(subgroup_ranges, row_col_images, beat_count):
+    """
+    Yield (subgroup_range, results) for each subgroup as soon as its lists are
+    generated, skipping subgroups without a swar row.
+    """
     for i, subgroup_range in enumerate(subgroup_ranges):
         is_first_subgroup = (i == 0)
         
@@ -223,15 +212,13 @@ def generate_lists_in_subgroups(subgroup_ranges, row_col_images, beat_count):
         swar_list, kann_swar_list, swar_articulation_checks, lyrics_articulation_checks, lyrics_list = generate_lists(subgroup_range, row_col_images, is_first_subgroup, beat_count)
         
         if swar_list and kann_swar_list:
-            subgroup_results[subgroup_range] = {
+            yield subgroup_range, {
                 'swar_list': swar_list,
                 'kann_swar_list': kann_swar_list,
                 'swar_articulation_checks': swar_articulation_checks,
                 'lyrics_articulation_checks': lyrics_articulation_checks,
                 'lyrics_list': lyrics_list
             }
-    
-    return subgroup_results
 
 # ----------------------------------------------------------------------------------------------------------
 
@@ -252,117 +239,251 @@ def update_kann_swar_and_generate_meend_lists():
         return
 
     for subgroup_range, results in subgroup_results.items():
-        kann_swar_list = results['kann_swar_list']
-        swar_list = results['swar_list']
-        
-        # Initialize meend list with empty values
-        meend_list = ['' for _ in range(len(swar_list))]
-        
-        i = 0
-        while i < len(kann_swar_list):
-            if kann_swar_list[i]:  # Check if the list is not empty
-                image_path = kann_swar_list[i][0]
-                # Extract width from the filename
-                filename = os.path.basename(image_path)
-                width = int(filename.split('_w')[1].split('_')[0])
-                
-                if width > 20:  # Only process if width > 20
-                    # Perform segmentation
-                    left_part, mid_part, right_part = segment_meend_and_kann_swar(image_path)
-                    
-                    # Identify and structure meend and kann swar
-                    left_part, mid_part, right_part = identify_meend_and_kann_swar(left_part, mid_part, right_part)
-                    
-                    if mid_part is not None:  # If meend is found
-                        # Mark start of meend
-                        meend_list[i] = 'S'
-                        
-                        # Calculate x + w for the current image
-                        x = int(filename.split('_x')[1].split('_')[0])
-                        w = width
-                        x_end = x + w
-                        
-                        # Find the end of meend
-                        j = i + 1
-                        while j < len(swar_list):
-                            # Skip empty swar positions
-                            if not swar_list[j]:  # Check if the list is empty
-                                j += 1
-                                continue
-                                
-                            swar_image_path = swar_list[j][0]
-                            swar_filename = os.path.basename(swar_image_path)
-                            swar_x = int(swar_filename.split('_x')[1].split('_')[0])
-                            
-                            if swar_x >= x_end:
-                                break  # Stop if swar_x is outside meend area
+        update_kann_swar_and_generate_meend_list(subgroup_range, results)
+    
+    # update the subgroup lists
+    save_lists_in_subgroups(subgroup_results)
+
+def update_kann_swar_and_generate_meend_list(subgroup_range, results):
+    """
+    Update the kann swar list of one subgroup and add its meend list (in place).
+    """
+    kann_swar_list = results['kann_swar_list']
+    swar_list = results['swar_list']
+    
+    # Initialize meend list with empty values
+    meend_list = ['' for _ in range(len(swar_list))]
+    
+    i = 0
+    while i < len(kann_swar_list):
+        if kann_swar_list[i]:  # Check if the list is not empty
+            image_path = kann_swar_list[i][0]
+            # Extract width from the filename
+            filename = os.path.basename(image_path)
+            width = int(filename.split('_w')[1].split('_')[0])
+    
+            if width > 20:  # Only process if width > 20
+                # Perform segmentation
+                left_part, mid_part, right_part = segment_meend_and_kann_swar(image_path)
+    
+                # Identify and structure meend and kann swar
+                left_part, mid_part, right_part = identify_meend_and_kann_swar(left_part, mid_part, right_part)
+    
+                if mid_part is not None:  # If meend is found
+                    # Mark start of meend
+                    meend_list[i] = 'S'
+    
+                    # Calculate x + w for the current image
+                    x = int(filename.split('_x')[1].split('_')[0])
+                    w = width
+                    x_end = x + w
+    
+                    # Find the end of meend
+                    j = i + 1
+                    while j < len(swar_list):
+                        # Skip empty swar positions
+                        if not swar_list[j]:  # Check if the list is empty
                             j += 1
-                        
-                        # Mark end of meend
-                        if j > i:
-                            meend_list[j - 1] = 'E'
-                        
-                        # Update kann swar list based on segmentation
-                        if left_part is not None:
-                            kann_swar_list[i] = [save_kann_swar_segment_from_meend(left_part, subgroup_range, i, 'left')]
-                        if right_part is not None:
-                            # Make sure j-1 is within bounds
-                            if j - 1 < len(kann_swar_list):
-                                kann_swar_list[j - 1] = [save_kann_swar_segment_from_meend(right_part, subgroup_range, j - 1, 'right')]
-                        if left_part is None and right_part is None:
-                            kann_swar_list[i] = []  # Remove the original image if no segmentation
-                        
-                        # Skip processed indices
-                        i = j
-                    else:
-                        i += 1
+                            continue
+    
+                        swar_image_path = swar_list[j][0]
+                        swar_filename = os.path.basename(swar_image_path)
+                        swar_x = int(swar_filename.split('_x')[1].split('_')[0])
+    
+                        if swar_x >= x_end:
+                            break  # Stop if swar_x is outside meend area
+                        j += 1
+    
+                    # Mark end of meend
+                    if j > i:
+                        meend_list[j - 1] = 'E'
+    
+                    # Update kann swar list based on segmentation
+                    if left_part is not None:
+                        kann_swar_list[i] = [save_kann_swar_segment_from_meend(left_part, subgroup_range, i, 'left')]
+                    if right_part is not None:
+                        # Make sure j-1 is within bounds
+                        if j - 1 < len(kann_swar_list):
+                            kann_swar_list[j - 1] = [save_kann_swar_segment_from_meend(right_part, subgroup_range, j - 1, 'right')]
+                    if left_part is None and right_part is None:
+                        kann_swar_list[i] = []  # Remove the original image if no segmentation
+    
+                    # Skip processed indices
+                    i = j
                 else:
                     i += 1
             else:
                 i += 1
-        
-        # Update the subgroup results with the meend list
-        subgroup_results[subgroup_range]['meend_list'] = meend_list
+        else:
+            i += 1
     
-    # update the subgroup lists
-    save_lists_in_subgroups(subgroup_results)
+    # Update the subgroup results with the meend list
+    results['meend_list'] = meend_list
+    return results
 
 # ----------------------------------------------------------------------------------------------------------
 
-from image_processing import preprocess_image_to_predict
+from image_processing import preprocess_image_to_predict, preprocess_images_to_predict, preprocess_array_to_predict, preprocess_arrays_to_predict
 from save_and_load import load_my_model, load_classes
+from app.config import INFERENCE
+from app.services.prediction_cache import lookup_predictions, store_predictions, get_cache_stats
+from app.services.inference_server import predict_remote
 
 # Pass the image through the model and get predictions
-def predict_class(image_path):
-
-    model = load_my_model()
-
+def predict_class(image_path, model=None):
     preprocessed_image = preprocess_image_to_predict(image_path)
-    predictions = model.predict(preprocessed_image)
-    predicted_class_index = np.argmax(predictions, axis=1)
-    max_probability = np.max(predictions, axis=1)
+    predicted_class_index, max_probability = predict_classes(preprocessed_image, model)
+    return predicted_class_index[0], max_probability[0]
+
+def predict_class_from_array(image, image_path=None, model=None):
+    """
+    Classify an in-memory crop. image_path is only used for error messages
+    and provenance, the pixels are never re-read from disk.
+    """
+    preprocessed_image = preprocess_array_to_predict(image, image_path)
+    predicted_class_index, max_probability = predict_classes(preprocessed_image, model)
     return predicted_class_index[0], max_probability[0]
 
-def generate_predictions(subgroup_results):
+def predict_classes_from_arrays(images, image_paths=None, model=None, batch_size=None):
+    """Classify a list of in-memory crops in batches, see predict_classes"""
+    return predict_classes(preprocess_arrays_to_predict(images, image_paths), model, batch_size)
+
+def run_classifier(images, model=None, batch_size=None):
+    """Run the classifier over preprocessed images and return the raw probabilities"""
+    if model is None:
+        model = load_my_model()
+    batch_size = batch_size or INFERENCE['batch_size']
+
+    probabilities = []
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        probabilities.append(np.asarray(model.predict_on_batch(batch)))
+
+    if not probabilities:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.concatenate(probabilities, axis=0)
+
+def classify_images(images, model=None, batch_size=None):
+    """
+    Return (class indices, max probabilities) for preprocessed images, using
+    the shared inference server when INFERENCE['server_address'] is set.
+    """
+    if not len(images):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    if INFERENCE['server_address'] and model is None:
+        try:
+            return predict_remote(images)
+        except ConnectionError as e:
+            print(f"{e}, falling back to the in-process model")
+
+    probabilities = run_classifier(images, model, batch_size)
+    return np.argmax(probabilities, axis=1), np.max(probabilities, axis=1)
+
+def predict_classes(images, model=None, batch_size=None):
+    """
+    Classify a stacked batch of preprocessed images, consulting the
+    prediction cache first when INFERENCE['prediction_cache'] is enabled.
+
+    Args:
+        images: Array of shape (N, 32, 32) from preprocess_images_to_predict
+        model: Classifier to use (defaults to the process-wide model)
+        batch_size: Number of images per forward pass
+    Returns:
+        Tuple of (class indices, max probabilities), one entry per image
+    """
+    if not INFERENCE['prediction_cache']:
+        return classify_images(images, model, batch_size)
+
+    keys, class_indices, max_probabilities, missing = lookup_predictions(images)
+    if missing.any():
+        # Identical glyphs in one batch only need a single forward pass
+        missing_positions = {}
+        for i in np.flatnonzero(missing):
+            missing_positions.setdefault(keys[i], []).append(i)
+        first_positions = [positions[0] for positions in missing_positions.values()]
+
+        new_indices, new_probabilities = classify_images(images[first_positions], model, batch_size)
+        for positions, class_index, probability in zip(missing_positions.values(), new_indices, new_probabilities):
+            class_indices[positions] = class_index
+            max_probabilities[positions] = probability
+
+        store_predictions(list(missing_positions), new_indices, new_probabilities)
+
+    return class_indices, max_probabilities
+
+def generate_predictions_batched(subgroup_results, batch_size=None):
+    """
+    Same output as generate_predictions, but every crop of every subgroup is
+    preprocessed into one array and classified in large batches.
+    """
+    CLASSES = load_classes()
+
+    # Gather each distinct crop path once, in the order it first appears
+    unique_paths = {}
+    for results in subgroup_results.values():
+        for key in ('swar_list', 'kann_swar_list'):
+            for paths in results[key]:
+                for path in paths:
+                    unique_paths.setdefault(path, len(unique_paths))
+
+    images = preprocess_images_to_predict(list(unique_paths))
+    class_indices, _ = predict_classes(images, batch_size=batch_size)
+
+    def to_class_names(crop_lists):
+        return [
+            [CLASSES[class_indices[unique_paths[path]]] for path in paths]
+            if paths else []
+            for paths in crop_lists
+        ]
+
+    predictions = {}
+    for subgroup_range, results in subgroup_results.items():
+        predictions[subgroup_range] = {
+            "predicted_swar_list": to_class_names(results['swar_list']),
+            "predicted_kann_swar_list": to_class_names(results['kann_swar_list']),
+            "meend_list": results['meend_list']
+        }
+
+    return predictions
+
+def generate_predictions(subgroup_results, batched=None, batch_size=None):
     """
     Generates predictions with proper class name mapping
     Args:
         subgroup_results: Dictionary containing 'swar_list' and 'kann_swar_list'
+        batched: Classify all crops in large batches (defaults to INFERENCE['batched'])
+        batch_size: Batch size for the batched mode (defaults to INFERENCE['batch_size'])
     Returns:
         Dictionary with predicted class names (not indices)
     """
+    if batched is None:
+        batched = INFERENCE['batched']
+    if batched:
+        predictions = generate_predictions_batched(subgroup_results, batch_size)
+    else:
+        predictions = generate_predictions_sequential(subgroup_results)
+
+    if INFERENCE['prediction_cache']:
+        print("Prediction cache:", get_cache_stats())
+    return predictions
+
+def generate_predictions_sequential(subgroup_results):
+    """Same output as generate_predictions, classifying one crop at a time"""
     predictions = {}
     CLASSES = load_classes()
+    # Leave the model to the inference server when one is configured
+    model = None if INFERENCE['server_address'] else load_my_model()
     
     for subgroup_range, results in subgroup_results.items():
         predictions[subgroup_range] = {
             "predicted_swar_list": [
-                [CLASSES[predict_class(path)[0]] for path in paths]  # Convert index to name
+                [CLASSES[predict_class(path, model)[0]] for path in paths]  # Convert index to name
                 if paths else []
                 for paths in results['swar_list']
             ],
             "predicted_kann_swar_list": [
-                [CLASSES[predict_class(path)[0]] for path in paths]  # Convert index to name
+                [CLASSES[predict_class(path, model)[0]] for path in paths]  # Convert index to name
                 if paths else []
                 for paths in results['kann_swar_list']
             ],
@@ -0,0 +1,158 @@
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+
+from app.config import PATHS
+from app.services.crop_store import list_crops, rename_crop
+
+# Per-job index of the glyph crops in the working composition, so the folder
+# is listed and the names parsed once, when the working composition is built.
+# Assigning a column or the 'extra' mark renames the crop the way the
+# frontend knows it (0_row4_col12_x400_y145_w7_h10.png, 0_row3_extra_x282_y116_w40_h18.png)
+# and updates its entry, later stages query the index.
+GLYPH_FIELDS = ('filename', 'page', 'row', 'col', 'x', 'y', 'w', 'h', 'extra')
+
+GLYPH_FILENAME_PATTERN = re.compile(r'(\d+)_row(\d+)(?:_col(\d+)|_(extra))?_x(\d+)_y(\d+)_w(\d+)_h(\d+)')
+
+
+@contextmanager
+def _connect():
+    """
+    Connection to the index, opened per call: /clear_outputs deletes the file
+    between jobs and a long-lived connection would keep writing to the old one
+    """
+    index_path = PATHS['glyph_index']
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    try:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS glyphs ("
+            "filename TEXT PRIMARY KEY, page INTEGER, row INTEGER, col INTEGER, "
+            "x INTEGER, y INTEGER, w INTEGER, h INTEGER, extra INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS glyphs_page_row ON glyphs (page, row)")
+        conn.execute("CREATE INDEX IF NOT EXISTS glyphs_row_col ON glyphs (row, col)")
+        yield conn
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def parse_glyph_filename(filename):
+    """(page, row, col, x, y, w, h, extra) from a crop filename, None if it is not one"""
+    match = GLYPH_FILENAME_PATTERN.match(filename)
+    if not match:
+        return None
+    page_num, row_num, col_num, extra, x, y, w, h = match.groups()
+    return (int(page_num), int(row_num), int(col_num) if col_num else None,
+            int(x), int(y), int(w), int(h), int(bool(extra)))
+
+
+def glyph_filename(page_num, row_num, x, y, w, h, suffix=None):
+    """Crop filename of a glyph, with its column ('col12') or 'extra' suffix once assigned"""
+    suffix = f"_{suffix}" if suffix else ""
+    return f"{page_num}_row{row_num}{suffix}_x{x}_y{y}_w{w}_h{h}.png"
+
+
+def build_glyph_index(folder=None):
+    """Replace the index with the crops in folder (the working composition by default)"""
+    folder = folder or PATHS['working_composition']
+    glyphs = []
+    for filename in list_crops(folder):
+        details = parse_glyph_filename(filename)
+        if details:
+            glyphs.append((filename,) + details)
+
+    with _connect() as conn:
+        conn.execute("DELETE FROM glyphs")
+        conn.executemany("INSERT INTO glyphs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", glyphs)
+    print(f"Glyph index built with {len(glyphs)} glyphs")
+    return len(glyphs)
+
+
+def ensure_glyph_index():
+    """Build the index from the working composition's filenames if this job has none yet"""
+    with _connect() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM glyphs").fetchone()[0]
+    if not count and os.path.exists(PATHS['working_composition']):
+        build_glyph_index()
+
+
+def query_glyphs(first_row=None, last_row=None, with_col=False, extra=None):
+    """
+    Glyphs as (filename, page, row, col, x, y, w, h, extra) tuples, ordered by row, column and position.
+
+    first_row / last_row bound the rows (inclusive), with_col keeps only glyphs
+    that were given a column and extra=False / True keeps only glyphs without /
+    with the 'extra' mark.
+    """
+    ensure_glyph_index()
+
+    conditions = []
+    params = []
+    if first_row is not None:
+        conditions.append("row >= ?")
+        params.append(first_row)
+    if last_row is not None:
+        conditions.append("row <= ?")
+        params.append(last_row)
+    if with_col:
+        conditions.append("col IS NOT NULL")
+    if extra is not None:
+        conditions.append("extra = ?")
+        params.append(int(extra))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with _connect() as conn:
+        return conn.execute(
+            f"SELECT {', '.join(GLYPH_FIELDS)} FROM glyphs {where} ORDER BY row, col, x, y, filename", params
+        ).fetchall()
+
+
+def count_glyphs_per_row():
+    """{row: number of glyphs}"""
+    ensure_glyph_index()
+    with _connect() as conn:
+        return dict(conn.execute("SELECT row, COUNT(*) FROM glyphs GROUP BY row").fetchall())
+
+
+def _rename_glyphs(renames):
+    """
+    Rename glyphs and record their column and 'extra' mark, renames is a list
+    of (filename, col, extra, suffix). As with os.rename, a glyph whose name is
+    taken over replaces the one that had it.
+    """
+    folder = PATHS['working_composition']
+    with _connect() as conn:
+        glyphs = {row[0]: row for row in conn.execute(f"SELECT {', '.join(GLYPH_FIELDS)} FROM glyphs")}
+        for filename, col, extra, suffix in renames:
+            if filename not in glyphs:
+                continue
+            _, page_num, row_num, _, x, y, w, h, _ = glyphs.pop(filename)
+            new_filename = glyph_filename(page_num, row_num, x, y, w, h, suffix)
+            if new_filename != filename:
+                rename_crop(os.path.join(folder, filename), os.path.join(folder, new_filename))
+                conn.execute("DELETE FROM glyphs WHERE filename = ?", (new_filename,))
+            conn.execute("UPDATE glyphs SET filename = ?, col = ?, extra = ? WHERE filename = ?",
+                         (new_filename, col, extra, filename))
+
+
+def set_glyph_columns(columns):
+    """Give glyphs their column number and rename them with it, columns is an iterable of (filename, col)"""
+    ensure_glyph_index()
+    _rename_glyphs([(filename, col, 0, f"col{col}") for filename, col in columns])
+
+
+def mark_glyphs_extra(filenames):
+    """Mark and rename glyphs above a subgroup's first valid row, they are left out of the composition"""
+    ensure_glyph_index()
+    _rename_glyphs([(filename, None, 1, "extra") for filename in filenames])
+
+
+def reset_glyph_columns():
+    """Forget column numbers and 'extra' marks, and the names they gave, before columns are assigned again"""
+    ensure_glyph_index()
+    with _connect() as conn:
+        assigned = [filename for filename, in conn.execute("SELECT filename FROM glyphs WHERE col IS NOT NULL OR extra = 1")]
+    _rename_glyphs([(filename, None, 0, None) for filename in assigned])
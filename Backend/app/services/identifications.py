@@ -86,13 +86,9 @@ def get_sam_and_taalis_rows(row_image_count, taal_name):
 
 # ------------------------------------------------------------------------------------------------------
 
-import os
 from collections import defaultdict
-from filename_utils import get_image_details_with_row_and_col
-from app.config import PATHS
-
-def is_articulation(w, h):
-    return 4 < h < 9 and w > 9
+from app.services.glyph_index import query_glyphs
+from app.services.mapping import is_articulation
 
 def classify_rows(subgroup_coords):
     articulation_rows = []
@@ -139,16 +135,13 @@ def classify_rows(subgroup_coords):
     return articulation_rows, kann_swar_rows, swar_rows, lyrics_rows
 
 def classify_rows_in_subgroups(subgroup_ranges):
-    composition_folder = PATHS['working_composition']
-    images = os.listdir(composition_folder)
-    coordinates = []
-
-    # Parse image details and store them
-    for image in images:
-        details = get_image_details_with_row_and_col(image)
-        if details:
-            page_num, row_num, col_num, x, y, w, h = details
-            coordinates.append((image, page_num, row_num, x, y, w, h))
+    # Glyphs that were given a column, by page, row and x: rows of each category
+    # are reported in page and row order
+    coordinates = sorted(
+        ((image, page_num, row_num, x, y, w, h)
+         for image, page_num, row_num, _, x, y, w, h, _ in query_glyphs(with_col=True)),
+        key=lambda glyph: (glyph[1], glyph[2], glyph[3])
+    )
 
     articulation_rows_all = []
     kann_swar_rows_all = []
@@ -187,7 +180,7 @@ def classify_rows_in_subgroups(subgroup_ranges):
 # ------------------------------------------------------------------------------------------------------
 
 import cv2
-from image_processing import preprocess_image_basic
+from app.services.image_processing import preprocess_image_basic
 
 # Function to check articulation in an image
 def check_articulation(image):
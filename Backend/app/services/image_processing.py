@@ -1,5 +1,7 @@
 import cv2
 import numpy as np
+from app.services.crop_store import read_crop
+from app.services.crop_memory import decode_like_imread
 
 def preprocess_image_advanced(image):
     # Convert to grayscale
@@ -54,11 +56,33 @@ def crop_white_background(image):
 
 # -----------------------------------------------------------------------------------------------------------
 
+# Preprocess an in-memory crop (BGR, BGRA or grayscale)
+def preprocess_array_to_predict(image, image_path=None):
+    if image is None:
+        raise ValueError(f"No image data for: {image_path}")
+    # Grey exactly as cv2.imread(path, cv2.IMREAD_GRAYSCALE) of the saved PNG, the model was trained on those
+    image = decode_like_imread(image, cv2.IMREAD_GRAYSCALE)
+    image = cv2.resize(image, (32, 32))  # Resize to match the model's input size
+    image = np.expand_dims(image, axis=0)  # Add batch dimension
+    return image
+
 # Preprocess the input image
 def preprocess_image_to_predict(image_path):
-    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    # Use the pixels a segmentation stage already holds or the crop store before decoding the PNG
+    image = read_crop(image_path, cv2.IMREAD_GRAYSCALE)
     if image is None:
         raise ValueError(f"Unable to read image at path: {image_path}")
-    image = cv2.resize(image, (32, 32))  # Resize to match the model's input size
-    image = np.expand_dims(image, axis=0)  # Add batch dimension
-    return image
\ No newline at end of file
+    return preprocess_array_to_predict(image, image_path)
+
+def preprocess_arrays_to_predict(images, image_paths=None):
+    """Preprocess several in-memory crops into one stacked (N, 32, 32) batch"""
+    if not len(images):
+        return np.empty((0, 32, 32), dtype=np.uint8)
+    image_paths = image_paths or [None] * len(images)
+    return np.concatenate([preprocess_array_to_predict(image, path) for image, path in zip(images, image_paths)], axis=0)
+
+def preprocess_images_to_predict(image_paths):
+    """Preprocess several images into one stacked (N, 32, 32) batch"""
+    if not image_paths:
+        return np.empty((0, 32, 32), dtype=np.uint8)
+    return np.concatenate([preprocess_image_to_predict(path) for path in image_paths], axis=0)
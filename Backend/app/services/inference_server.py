@@ -0,0 +1,204 @@
+"""
+Local inference service shared by all Flask workers on a machine.
+
+One process owns the classifier and listens on a Unix socket. Crop batches
+sent by the workers within INFERENCE['server_batch_window_ms'] of each other
+are merged into a single forward pass.
+
+    python -m app.services.inference_server
+
+Run from the Backend folder, then set INFERENCE['server_address'] to the same
+socket path so generate_predictions becomes a client of the service. Server
+and clients share a secret from SWARLIPI_INFERENCE_AUTHKEY or
+INFERENCE['server_authkey_file']: connections exchange pickles, so anyone
+holding the key can run code in the server. The socket is only accessible
+to the user running the server.
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from app.config import INFERENCE
+from app.services.model_registry import get_model
+from app.services.cpu_budget import configure_cpu_budget
+from app.services.warmup import warm_up_model
+
+# Pending requests from all connections: (images, reply queue)
+_PENDING = queue.Queue()
+
+
+def get_server_authkey():
+    """
+    Shared secret from the SWARLIPI_INFERENCE_AUTHKEY environment variable,
+    else from INFERENCE['server_authkey_file'].
+
+    Raises:
+        ValueError: if neither is set
+    """
+    authkey = os.environ.get('SWARLIPI_INFERENCE_AUTHKEY', '').encode()
+    if not authkey and INFERENCE['server_authkey_file']:
+        with open(INFERENCE['server_authkey_file'], 'rb') as f:
+            authkey = f.read().strip()
+    if not authkey:
+        raise ValueError("No inference server key: set SWARLIPI_INFERENCE_AUTHKEY or INFERENCE['server_authkey_file']")
+    return authkey
+
+
+def _collect_micro_batch():
+    """Block for the first request, then gather whatever arrives within the batch window"""
+    requests = [_PENDING.get()]
+    total = len(requests[0][0])
+    deadline = time.monotonic() + INFERENCE['server_batch_window_ms'] / 1000
+
+    while total < INFERENCE['server_max_batch']:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            request = _PENDING.get(timeout=remaining)
+        except queue.Empty:
+            break
+        requests.append(request)
+        total += len(request[0])
+
+    return requests
+
+
+def _run_batches():
+    """Merge pending requests into micro-batches and answer each caller"""
+    model = get_model()
+    batch_size = INFERENCE['batch_size']
+
+    while True:
+        requests = _collect_micro_batch()
+        try:
+            images = np.concatenate([images for images, _ in requests], axis=0)
+            probabilities = []
+            for start in range(0, len(images), batch_size):
+                probabilities.append(np.asarray(model.predict_on_batch(images[start:start + batch_size])))
+            probabilities = np.concatenate(probabilities, axis=0)
+            class_indices = np.argmax(probabilities, axis=1)
+            max_probabilities = np.max(probabilities, axis=1)
+        except Exception as e:
+            print(f"Inference batch failed: {e}")
+            for _, reply in requests:
+                reply.put({'error': str(e)})
+            continue
+
+        offset = 0
+        for request_images, reply in requests:
+            count = len(request_images)
+            reply.put({
+                'class_indices': class_indices[offset:offset + count],
+                'probabilities': max_probabilities[offset:offset + count],
+            })
+            offset += count
+
+
+def _handle_connection(conn):
+    """Serve one worker connection until it closes"""
+    reply = queue.Queue(maxsize=1)
+    with conn:
+        while True:
+            try:
+                request = conn.recv()
+            except (EOFError, OSError):
+                return
+
+            images = np.asarray(request['images'])
+            if not len(images):
+                conn.send({'class_indices': np.empty(0, dtype=np.int64),
+                           'probabilities': np.empty(0, dtype=np.float32)})
+                continue
+
+            _PENDING.put((images, reply))
+            conn.send(reply.get())
+
+
+def serve(address=None):
+    """Load the classifier and answer prediction requests on a Unix socket"""
+    address = address or INFERENCE['server_address']
+    if not address:
+        raise ValueError("No socket path given and INFERENCE['server_address'] is not set")
+    authkey = get_server_authkey()
+    if os.path.exists(address):
+        os.unlink(address)  # Stale socket from a previous run
+
+    configure_cpu_budget()
+    warm_up_model(use_server=False)
+    threading.Thread(target=_run_batches, daemon=True).start()
+
+    # Created owner-only (0600): no other local user may even attempt the handshake
+    previous_umask = os.umask(0o177)
+    try:
+        listener = Listener(address, family='AF_UNIX', authkey=authkey)
+    finally:
+        os.umask(previous_umask)
+    os.chmod(address, 0o600)
+
+    with listener:
+        print(f"Inference server listening on {address}")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError) as e:
+                print(f"Rejected inference connection: {e}")
+                continue
+            threading.Thread(target=_handle_connection, args=(conn,), daemon=True).start()
+
+# ----------------------------------------------------------------------------------------------------------
+
+# One persistent connection per client thread
+_CLIENT = threading.local()
+
+
+def _get_connection(address):
+    conn = getattr(_CLIENT, 'conn', None)
+    if conn is None or getattr(_CLIENT, 'address', None) != address:
+        conn = Client(address, family='AF_UNIX', authkey=get_server_authkey())
+        _CLIENT.conn = conn
+        _CLIENT.address = address
+    return conn
+
+
+def predict_remote(images, address=None):
+    """
+    Classify preprocessed images on the shared inference server.
+
+    Args:
+        images: Array of shape (N, 32, 32) from preprocess_images_to_predict
+        address: Socket path (defaults to INFERENCE['server_address'])
+    Returns:
+        Tuple of (class indices, max probabilities), one entry per image
+    Raises:
+        ConnectionError: if the server cannot be reached
+    """
+    address = address or INFERENCE['server_address']
+    try:
+        conn = _get_connection(address)
+        conn.send({'images': np.ascontiguousarray(images)})
+        response = conn.recv()
+    except (OSError, EOFError, ValueError) as e:
+        _CLIENT.conn = None
+        raise ConnectionError(f"Inference server at {address} is unavailable: {e}")
+
+    if 'error' in response:
+        raise RuntimeError(f"Inference server error: {response['error']}")
+    return response['class_indices'], response['probabilities']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared swar classifier inference server")
+    parser.add_argument('--address', default=None, help="Unix socket path (defaults to INFERENCE['server_address'])")
+    args = parser.parse_args()
+    serve(args.address)
+
+
+if __name__ == '__main__':
+    main()
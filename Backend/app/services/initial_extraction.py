@@ -2,87 +2,660 @@ import cv2
 import numpy as np
 import os
 import fitz
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from PIL import Image
+from app.config import EXTRACTION, PATHS
+from app.services.cpu_budget import configure_pool_worker, get_cpu_budget
 from app.services.image_processing import enlarge_image, enhance_quality, preprocess_image_advanced
-from app.services.mapping import create_mapping, assign_number
+from app.services.mapping import create_mapping, IntervalIndex, is_articulation
+from app.services.crop_store import list_crops, store_crop, store_virtual_crops, virtual_crops_enabled
+from app.services.save_data import save_rows_to_file, load_rows_from_file
+from app.services.page_rasters import render_page, load_page_raster, page_raster_cache_enabled, pdf_raster_key, remember_pdf_raster_key
+
+
+# One record per glyph, its bounding box in page pixels
+GLYPH_DTYPE = np.dtype([('x', np.int32), ('y', np.int32), ('w', np.int32), ('h', np.int32)])
+
+def detect_glyph_stats_contours(processed_image):
+    contours, _ = cv2.findContours(processed_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    glyphs = np.empty(len(contours), dtype=GLYPH_DTYPE)
+    for i, contour in enumerate(contours):
+        glyphs[i] = cv2.boundingRect(contour)
+    return glyphs
+
+def detect_glyph_stats_components(processed_image):
+    """
+    Same glyphs, in the same order, as the external contours, from connected components.
+
+    RETR_EXTERNAL ignores anything inside a glyph's holes, so the holes are filled
+    first: background pixels (4-connected, the dual of 8-connected glyphs) that
+    cannot reach the image border belong to the glyph around them.
+    """
+    padded = cv2.copyMakeBorder(processed_image, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+    _, background = cv2.connectedComponents((padded == 0).view(np.uint8), connectivity=4, ltype=cv2.CV_32S)
+    filled = (background[1:-1, 1:-1] != background[0, 0]).view(np.uint8)
+
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(filled, connectivity=8, ltype=cv2.CV_32S)
+    stats = stats[1:]  # label 0 is the background
+
+    # findContours finds glyphs in raster order of their top-left pixel and returns them reversed
+    top_rows = labels[stats[:, cv2.CC_STAT_TOP]]
+    first_x = np.argmax(top_rows == np.arange(1, count)[:, None], axis=1)
+    order = np.argsort(stats[:, cv2.CC_STAT_TOP].astype(np.int64) * processed_image.shape[1] + first_x)[::-1]
+
+    glyphs = np.empty(count - 1, dtype=GLYPH_DTYPE)
+    glyphs['x'] = stats[order, cv2.CC_STAT_LEFT]
+    glyphs['y'] = stats[order, cv2.CC_STAT_TOP]
+    glyphs['w'] = stats[order, cv2.CC_STAT_WIDTH]
+    glyphs['h'] = stats[order, cv2.CC_STAT_HEIGHT]
+    return glyphs
+
+def detect_glyph_stats(np_page_image, glyph_detection=None):
+    """
+    Glyphs of a rendered page as a GLYPH_DTYPE structured array.
+
+    glyph_detection (see EXTRACTION['glyph_detection']) is 'contours' for
+    findContours + boundingRect or 'components' for connectedComponentsWithStats,
+    both give the same boxes in the same order.
+    """
+    processed_image = preprocess_image_advanced(np_page_image)
+
+    if (glyph_detection or EXTRACTION['glyph_detection']) == 'components':
+        return detect_glyph_stats_components(processed_image)
+    return detect_glyph_stats_contours(processed_image)
+
+def glyph_boxes(glyphs):
+    """(N, 4) int array of x, y, w, h from glyph stats or a list of (x, y, w, h)"""
+    if isinstance(glyphs, np.ndarray) and glyphs.dtype == GLYPH_DTYPE:
+        return np.stack([glyphs['x'], glyphs['y'], glyphs['w'], glyphs['h']], axis=1)
+    return np.asarray(glyphs, dtype=np.int32).reshape(-1, 4)
+
+def detect_glyphs(np_page_image, glyph_detection=None):
+    # Extract coordinates for the current page
+    return [tuple(box) for box in glyph_boxes(detect_glyph_stats(np_page_image, glyph_detection)).tolist()]
+
+# Pages whose images cover more than this share of the page are scans, even with an OCR text layer
+VECTOR_TEXT_MAX_IMAGE_COVERAGE = 0.5
+
+def merge_overlapping_rects(rects):
+    """Union rects that overlap along a line, e.g. the parts of a conjunct or a matra and its letter"""
+    merged = []
+    for rect in sorted(rects, key=lambda rect: rect.x0):
+        if merged and rect.intersects(merged[-1]):
+            merged[-1] |= rect
+        else:
+            merged.append(fitz.Rect(rect))
+    return merged
+
+def detect_vector_rects(page):
+    """
+    Glyph rects of a born-digital page from its text layer, in 1x page pixels.
+
+    Character boxes come from get_text('rawdict') (with accurate bboxes when this
+    PyMuPDF has them), merged where they overlap within a line, and small vector
+    strokes such as articulation lines come from get_drawings. Returns an (N, 4)
+    float array of x0, y0, x1, y1, or None when the page has no text or is
+    mostly covered by images.
+    """
+    page_rect = page.rect
+    image_area = sum(abs(fitz.Rect(info['bbox']) & page_rect) for info in page.get_image_info())
+    if image_area > VECTOR_TEXT_MAX_IMAGE_COVERAGE * abs(page_rect):
+        return None
+
+    flags = getattr(fitz, 'TEXTFLAGS_RAWDICT', 0) | getattr(fitz, 'TEXT_ACCURATE_BBOXES', 0)
+    text = page.get_text('rawdict', flags=flags)
+
+    rects = []
+    for block in text['blocks']:
+        if block['type'] != 0:
+            continue
+        for line in block['lines']:
+            line_rects = [
+                fitz.Rect(char['bbox']) for span in line['spans'] for char in span['chars']
+                if not char['c'].isspace() and not fitz.Rect(char['bbox']).is_empty
+            ]
+            rects.extend(merge_overlapping_rects(line_rects))
+
+    if not rects:
+        return None
+
+    for drawing in page.get_drawings():
+        # Page frames and rules are not glyphs
+        rect = fitz.Rect(drawing['rect'])
+        if rect.width > page_rect.width / 2 or rect.height > page_rect.height / 2:
+            continue
+        # Straight lines have an empty rect, give them their stroke width
+        half_width = (drawing.get('width') or 1) / 2
+        rects.append(rect + (-half_width, -half_width, half_width, half_width))
+
+    origin = (page_rect.x0, page_rect.y0, page_rect.x0, page_rect.y0)
+    return np.array([tuple((rect & page_rect) - origin) for rect in rects], dtype=np.float64).reshape(-1, 4)
+
+def detect_vector_glyphs(page, np_page_image=None, glyph_detection=None):
+    """
+    Glyphs of a born-digital page grouped by its text layer, with the raster's geometry.
+
+    Font boxes are not ink boxes (a '-' cell is wider and flatter than its
+    thresholded ink), so the boxes are snapped to the raster glyphs: raster
+    glyphs overlapping the same character or stroke, directly or through
+    each other, make one glyph with their union box. Raster specks outside the
+    text layer are dropped. Returns a GLYPH_DTYPE array like detect_glyph_stats,
+    or None when the page has no usable text layer and the raster path is used instead.
+    """
+    rects = detect_vector_rects(page)
+    if rects is None:
+        return None
+
+    if np_page_image is None:
+        np_page_image = load_page_raster(page)
+    raster = detect_glyph_stats(np_page_image, glyph_detection)
+    if not len(raster):
+        return None
+    boxes = glyph_boxes(raster)
+    x0, y0 = boxes[:, 0], boxes[:, 1]
+    x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+
+    # overlaps[i, j]: vector rect i and raster glyph j share some area
+    overlaps = ((rects[:, None, 0] < x1) & (x0 < rects[:, None, 2]) &
+                (rects[:, None, 1] < y1) & (y0 < rects[:, None, 3]))
+
+    # Union-find over raster glyphs, joined through the rects they overlap
+    parent = list(range(len(raster)))
+
+    def find(j):
+        while parent[j] != j:
+            parent[j] = parent[parent[j]]
+            j = parent[j]
+        return j
+
+    for row in overlaps:
+        hits = np.flatnonzero(row)
+        for j in hits[1:]:
+            parent[find(j)] = find(hits[0])
+
+    groups = {}
+    for j in np.flatnonzero(overlaps.any(axis=0)).tolist():
+        groups.setdefault(find(j), []).append(j)
+
+    # In the raster's order, by each group's first glyph
+    glyphs = np.empty(len(groups), dtype=GLYPH_DTYPE)
+    for i, members in enumerate(sorted(groups.values(), key=min)):
+        if len(members) == 1:
+            glyphs[i] = raster[members[0]]
+            continue
+        gx0, gy0 = int(x0[members].min()), int(y0[members].min())
+        gw, gh = int(x1[members].max()) - gx0, int(y1[members].max()) - gy0
+        glyphs[i] = (gx0, gy0, gw, gh)
+    return glyphs
+
+def detect_page_glyphs(page, np_page_image=None, glyph_detection=None, vector_text=None):
+    """
+    Coordinates of a page's glyphs: grouped by the text layer if vector_text is
+    set (see EXTRACTION['vector_text']) and the page has one, else from the raster.
+    """
+    if EXTRACTION['vector_text'] if vector_text is None else vector_text:
+        glyphs = detect_vector_glyphs(page, np_page_image, glyph_detection)
+        if glyphs is not None:
+            return [tuple(box) for box in glyph_boxes(glyphs).tolist()]
+
+    if np_page_image is None:
+        np_page_image = load_page_raster(page)
+    return detect_glyphs(np_page_image, glyph_detection)
+
+def build_row_mapping(coordinates, aspect_ratio_threshold, last_row_number):
+    # Sort coordinates by y-axis (rows)
+    coordinates_sorted_by_y = sorted(coordinates, key=lambda item: item[1])
+
+    # Create row mapping for the current page
+    row_mapping = create_mapping(coordinates_sorted_by_y, aspect_ratio_threshold, is_row=True)
+
+    # Adjust row numbers to continue from the last row number of the previous page
+    adjusted_row_mapping = []
+    for num, lower_limit, upper_limit in row_mapping:
+        adjusted_row_mapping.append((num + last_row_number, lower_limit, upper_limit))
+    return adjusted_row_mapping
+
+# Glyph crops are this many times the page resolution in every crop mode: enlarge_image's
+# scale factor, bands are enhanced at this scale and crops sliced out of them, and the
+# segmentation stages scale crop coordinates back down by it
+ENHANCEMENT_SCALE = 3
+
+def render_region(page, x, y, w, h, zoom):
+    """
+    Render the (x, y, w, h) page region, in 1x page units, at zoom straight
+    from the PDF, resampled to ENHANCEMENT_SCALE times its size
+    """
+    clip = fitz.Rect(x, y, x + w, y + h) + (page.rect.x0, page.rect.y0, page.rect.x0, page.rect.y0)
+    region_image = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+    region = np.frombuffer(region_image.samples, dtype=np.uint8).reshape((region_image.height, region_image.width, region_image.n))
+
+    # Clip rounding can be a pixel off, and any other zoom is brought to the upscale mode's size
+    size = (w * ENHANCEMENT_SCALE, h * ENHANCEMENT_SCALE)
+    if region.shape[1::-1] != size:
+        interpolation = cv2.INTER_AREA if region.shape[1] > size[0] else cv2.INTER_LANCZOS4
+        region = cv2.resize(region, size, interpolation=interpolation)
+    return region
+
+def acquire_region(np_page_image, page, x, y, w, h, crop_mode):
+    """
+    Glyph crop at 3x the page resolution.
+
+    'upscale' enlarges the 72 dpi page crop with Lanczos and sharpens/denoises it,
+    'render' re-renders the clip rectangle at EXTRACTION['render_zoom'] from the
+    PDF and resamples it to 3x, which keeps the real detail of vector and high
+    resolution PDFs.
+    """
+    if crop_mode == 'render':
+        return render_region(page, x, y, w, h, EXTRACTION['render_zoom'])
+
+    alphabet_region = np_page_image[y:y+h, x:x+w]
+    enlarged_region = enlarge_image(alphabet_region)
+    return enhance_quality(enlarged_region)
+
+# Context (in 1x page pixels) kept around a row band so the sharpening kernel,
+# the Lanczos support and the 21 px denoising search window at 3x see real neighbours
+ROW_BAND_MARGIN = 4
+
+def get_row_bands(regions, page_shape, margin=ROW_BAND_MARGIN):
+    """
+    Group regions by row: list of ((x, y, w, h) band, regions) covering the row's crops.
+    A row is split where the gap between glyphs is wider than the margins on both
+    sides, so the blank space between words is not denoised.
+    """
+    rows = {}
+    for region in regions:
+        rows.setdefault(region[1], []).append(region)
+
+    groups = []
+    for row_regions in rows.values():
+        row_regions = sorted(row_regions, key=lambda region: region[2])
+        group = [row_regions[0]]
+        right = row_regions[0][2] + row_regions[0][4]
+        for region in row_regions[1:]:
+            if region[2] - margin > right + margin:
+                groups.append(group)
+                group = []
+            group.append(region)
+            right = max(right, region[2] + region[4])
+        groups.append(group)
+
+    bands = []
+    for group in groups:
+        x0 = max(0, min(x for _, _, x, _, _, _, _ in group) - margin)
+        y0 = max(0, min(y for _, _, _, y, _, _, _ in group) - margin)
+        x1 = min(page_shape[1], max(x + w for _, _, x, _, w, _, _ in group) + margin)
+        y1 = min(page_shape[0], max(y + h for _, _, _, y, _, h, _ in group) + margin)
+        bands.append(((x0, y0, x1 - x0, y1 - y0), group))
+    return bands
+
+def plan_enhancement_bands(regions, page_shape, crop_mode, enhancement='per_crop'):
+    """
+    {filename: (x, y, w, h)} of the band of the page each crop is enhanced in
+    and sliced out of: its row band with 'row' enhancement, the whole page with
+    'page'. Crops enhanced on their own ('render', 'per_crop' and articulation
+    rows) have none. Planned over all regions of the page, so a crop acquired
+    later on its own is cut from the very same enhanced pixels.
+    """
+    if crop_mode == 'render' or enhancement == 'per_crop':
+        return {}
+    regions = [region for region in regions if region[6] != GLYPH_ARTICULATION]
+    if not regions:
+        return {}
+
+    if enhancement == 'page':
+        page_band = (0, 0, page_shape[1], page_shape[0])
+        return {region[0]: page_band for region in regions}
+    return {region[0]: band for band, band_regions in get_row_bands(regions, page_shape) for region in band_regions}
+
+def enhance_band(np_page_image, band):
+    bx, by, bw, bh = band
+    return enhance_quality(enlarge_image(np_page_image[by:by+bh, bx:bx+bw], ENHANCEMENT_SCALE))
+
+def slice_enhanced_band(enhanced_band, band, x, y, w, h):
+    """The (x, y, w, h) crop, in 1x page pixels, out of its enhanced band"""
+    top, left = (y - band[1]) * ENHANCEMENT_SCALE, (x - band[0]) * ENHANCEMENT_SCALE
+    return np.ascontiguousarray(enhanced_band[top:top + h * ENHANCEMENT_SCALE, left:left + w * ENHANCEMENT_SCALE])
+
+def acquire_regions(np_page_image, page, regions, crop_mode, enhancement='per_crop', bands=None):
+    """
+    Yield (filename, crop) for regions from plan_alphabet_regions.
+
+    In 'upscale' mode, enhancement decides what enlarge_image and enhance_quality
+    run on: 'per_crop' every crop separately, 'row' one band per row and 'page'
+    the whole page once, with the crops sliced out of the enhanced band or page.
+    bands (see plan_enhancement_bands) are planned from regions unless given,
+    pass the page's bands when regions are only some of its crops.
+    Articulation rows are only enlarged, they are never classified.
+    """
+    if bands is None:
+        bands = plan_enhancement_bands(regions, np_page_image.shape, crop_mode, enhancement)
+
+    if crop_mode != 'render':
+        for filename, _, x, y, w, h, label in regions:
+            if label == GLYPH_ARTICULATION:
+                yield filename, enlarge_image(np_page_image[y:y+h, x:x+w])
+        regions = [region for region in regions if region[6] != GLYPH_ARTICULATION]
+
+    banded_regions = {}
+    for region in regions:
+        band = bands.get(region[0])
+        if band is None:
+            filename, _, x, y, w, h, _ = region
+            yield filename, acquire_region(np_page_image, page, x, y, w, h, crop_mode)
+        else:
+            banded_regions.setdefault(tuple(band), []).append(region)
+
+    for band, band_regions in banded_regions.items():
+        enhanced_band = enhance_band(np_page_image, band)
+        for filename, _, x, y, w, h, _ in band_regions:
+            yield filename, slice_enhanced_band(enhanced_band, band, x, y, w, h)
+
+# Labels given to detected boxes before any pixel work
+GLYPH_NOISE = 'noise'
+GLYPH_ARTICULATION = 'articulation'
+GLYPH = 'glyph'
+
+def classify_glyph_boxes(boxes, row_nums, aspect_ratio_threshold):
+    """
+    Label every box from its geometry alone.
+
+    noise: too tall for its width, outside every row, or smaller than 6x6; never saved.
+    articulation: an articulation line (mapping.is_articulation) in a row
+                  made only of articulation lines. classify_rows makes such a row an
+                  articulation row, and only its boxes' positions are used from then on.
+    glyph: everything else, including articulation shaped marks in other rows.
+    """
+    x, y, w, h = boxes.T
+    noise = (h / w > aspect_ratio_threshold) | (row_nums == -1) | ((w < 6) & (h < 6))
+    articulation = is_articulation(w, h) & ~noise
+
+    # Rows where some saved box is not an articulation line
+    mixed_rows = np.unique(row_nums[~noise & ~articulation])
+    articulation &= ~np.isin(row_nums, mixed_rows)
+
+    labels = np.full(len(boxes), GLYPH, dtype=object)
+    labels[noise] = GLYPH_NOISE
+    labels[articulation] = GLYPH_ARTICULATION
+    return labels
+
+def plan_alphabet_regions(page_num, coordinates, row_mapping, output_folder, aspect_ratio_threshold):
+    """Filter the page's glyphs and name their crops: list of (filename, row_num, x, y, w, h, label)"""
+    boxes = glyph_boxes(coordinates)
+    row_nums = IntervalIndex(row_mapping).lookup_many(boxes[:, 1])
+    labels = classify_glyph_boxes(boxes, row_nums, aspect_ratio_threshold)
+    keep = labels != GLYPH_NOISE
+
+    regions = []
+    planned = list_crops(output_folder)
+    for row_num, (x, y, w, h), label in zip(row_nums[keep].tolist(), boxes[keep].tolist(), labels[keep]):
+        base_filename = f"{page_num}_row{row_num}_x{x}_y{y}_w{w}_h{h}"
+        counter = 1
+        filename = f"{base_filename}.png"
+        while filename in planned:
+            filename = f"{base_filename}_{counter}.png"
+            counter += 1
+
+        planned.add(filename)
+        regions.append((filename, row_num, x, y, w, h, label))
+    return regions
+
+def save_crop(output_folder, filename, enhanced_region, crop_store=None):
+    """Save an RGB crop as a PNG, or into the packed crop store (in cv2.imread's BGR order) when it is on"""
+    image_path = os.path.join(output_folder, filename)
+    if not store_crop(image_path, cv2.cvtColor(enhanced_region, cv2.COLOR_RGB2BGR), crop_store):
+        Image.fromarray(enhanced_region).save(image_path)
+
+def save_alphabet_regions(np_page_image, page_num, coordinates, row_mapping, output_folder, aspect_ratio_threshold,
+                          page=None, crop_mode='upscale', enhancement='per_crop', crop_store=None, virtual_crops=None):
+    # Process and save alphabet regions for the current page
+    regions = plan_alphabet_regions(page_num, coordinates, row_mapping, output_folder, aspect_ratio_threshold)
+    if virtual_crops_enabled(virtual_crops) and page is not None:
+        bands = plan_enhancement_bands(regions, np_page_image.shape, crop_mode, enhancement)
+        store_virtual_crops(output_folder, page.parent.name, page_num, regions, crop_mode, enhancement, bands)
+        return
+    for filename, enhanced_region in acquire_regions(np_page_image, page, regions, crop_mode, enhancement):
+        save_crop(output_folder, filename, enhanced_region, crop_store)
+
+def discard_lazy_extraction():
+    """Forget the crops recorded by the job's last lazy extraction"""
+    if os.path.exists(f"{PATHS['lazy_extraction']}.json"):
+        os.remove(f"{PATHS['lazy_extraction']}.json")
+
+def materialize_crops_in_row_range(output_folder, first_row, last_row, pdf_path=None):
+    """
+    Lazy mode counterpart of copy_images_in_row_range: acquire and save only
+    the crops of rows first_row..last_row recorded by a lazy extraction.
+
+    Returns False if the job's last extraction was not lazy, or was of a PDF
+    other than pdf_path (when given).
+    """
+    lazy_extraction = load_rows_from_file(PATHS['lazy_extraction'])
+    if not lazy_extraction:
+        return False
+    if pdf_path and lazy_extraction.get('pdf_hash') != pdf_raster_key(pdf_path):
+        print(f"Ignoring the lazy extraction of {lazy_extraction['pdf_path']}, it is not of {pdf_path}")
+        return False
 
-def extract_alphabets(pdf_path, output_folder, aspect_ratio_threshold=3):
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
-    pdf_document = fitz.open(pdf_path)
+    page_crops = {}
+    crops_by_page = {}
+    for page_num, row_num, x, y, w, h, filename, label in lazy_extraction['crops']:
+        page_crops.setdefault(page_num, []).append((filename, row_num, x, y, w, h, label))
+        if first_row <= row_num <= last_row:
+            crops_by_page.setdefault(page_num, []).append((filename, row_num, x, y, w, h, label))
+
+    pdf_document = fitz.open(lazy_extraction['pdf_path'])
+    crop_mode = lazy_extraction['crop_mode']
+    enhancement = lazy_extraction.get('enhancement', 'per_crop')
+    for page_num, crops in crops_by_page.items():
+        page = pdf_document.load_page(page_num)
+        np_page_image = load_page_raster(page)
+        # Bands of the whole page, as the eager extraction enhanced them
+        bands = plan_enhancement_bands(page_crops[page_num], np_page_image.shape, crop_mode, enhancement)
+        for filename, enhanced_region in acquire_regions(np_page_image, page, crops, crop_mode, enhancement, bands):
+            save_crop(output_folder, filename, enhanced_region)
+
+    print(f"Materialized {sum(len(crops) for crops in crops_by_page.values())} crops for rows {first_row}-{last_row}")
+    return True
+
+def extract_alphabets(pdf_path, output_folder, aspect_ratio_threshold=3, workers=None, crop_mode=None, lazy=None,
+                      enhancement=None, page_nums=None):
+    """
+    Detect glyphs on every page, build row mappings numbered continuously
+    across pages and save the enhanced glyph crops to output_folder.
+
+    workers > 1 processes pages in a process pool (see EXTRACTION['workers']);
+    the results and filenames are the same as the sequential path.
+    crop_mode selects how crops are acquired (see EXTRACTION['crop_mode']),
+    filenames keep 1x page coordinates in both modes.
+    enhancement selects where upscaled crops are enhanced (see EXTRACTION['enhancement']).
+    lazy (see EXTRACTION['lazy']) only records the crops' bounding boxes, they
+    are saved by materialize_crops_in_row_range once the row range is chosen.
+    page_nums restricts extraction to these 0-based pages, the others get empty
+    coordinates and row mappings so both lists stay indexed by page, and rows
+    are numbered continuously across the selected pages.
+    """
     all_coordinates = []  # To store coordinates for all pages
     all_row_mappings = []  # To store row mappings for all pages
+
+    for _, coordinates, row_mapping in iter_extract_alphabets(pdf_path, output_folder, aspect_ratio_threshold, workers, crop_mode,
+                                                              lazy, enhancement, page_nums):
+        all_coordinates.append(coordinates)
+        all_row_mappings.append(row_mapping)
+
+    return all_coordinates, all_row_mappings
+
+def iter_extract_alphabets(pdf_path, output_folder, aspect_ratio_threshold=3, workers=None, crop_mode=None, lazy=None,
+                           enhancement=None, page_nums=None):
+    """
+    Generator version of extract_alphabets.
+
+    Yields (page_num, coordinates, row_mapping) for every page in page order,
+    once the page's crops are saved. Pages without contours, or outside
+    page_nums, yield empty lists.
+    """
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    workers = get_extraction_workers(workers)
+    crop_mode = crop_mode or EXTRACTION['crop_mode']
+    enhancement = enhancement or EXTRACTION['enhancement']
+    lazy = EXTRACTION['lazy'] if lazy is None else lazy
+
+    # A new extraction replaces the crops recorded by the previous lazy one
+    discard_lazy_extraction()
+
+    pdf_document = fitz.open(pdf_path)
+    page_count = len(pdf_document)
+    page_nums = range(page_count) if page_nums is None else sorted(set(page_nums) & set(range(page_count)))
+    if workers > 1 and len(page_nums) > 1:
+        pdf_document.close()
+        pages = iter_extract_alphabets_parallel(pdf_path, page_count, output_folder, aspect_ratio_threshold, workers,
+                                                crop_mode, lazy, enhancement, page_nums)
+    else:
+        pages = iter_extract_alphabets_sequential(pdf_document, output_folder, aspect_ratio_threshold, crop_mode, lazy,
+                                                  enhancement, page_nums)
+
+    lazy_crops = []
+    for page_num, coordinates, row_mapping in pages:
+        if lazy and coordinates:
+            for filename, row_num, x, y, w, h, label in plan_alphabet_regions(page_num, coordinates, row_mapping,
+                                                                              output_folder, aspect_ratio_threshold):
+                lazy_crops.append((page_num, row_num, x, y, w, h, filename, label))
+        yield page_num, coordinates, row_mapping
+
+    if lazy:
+        os.makedirs(os.path.dirname(PATHS['lazy_extraction']) or '.', exist_ok=True)
+        save_rows_to_file({
+            'pdf_path': pdf_path,
+            # Checked by materialize_crops_in_row_range, a PDF replaced under the same path has other crops
+            'pdf_hash': pdf_raster_key(pdf_path),
+            'crop_mode': crop_mode,
+            'enhancement': enhancement,
+            'crops': lazy_crops,
+        }, PATHS['lazy_extraction'])
+
+def iter_extract_alphabets_sequential(pdf_document, output_folder, aspect_ratio_threshold, crop_mode, lazy, enhancement,
+                                      page_nums):
     last_row_number = 0  # To ensure row numbers continue across pages
+    page_nums = set(page_nums)
 
     for page_num in range(len(pdf_document)):
-        page = pdf_document.load_page(page_num)
-        page_image = page.get_pixmap()
-        np_page_image = np.frombuffer(page_image.samples, dtype=np.uint8).reshape((page_image.height, page_image.width, page_image.n))
-
-        processed_image = preprocess_image_advanced(np_page_image)
+        if page_num not in page_nums:
+            yield page_num, [], []
+            continue
 
-        contours, _ = cv2.findContours(processed_image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        page = pdf_document.load_page(page_num)
+        # Lazy extraction only renders the page to detect its glyphs
+        np_page_image = None if lazy else load_page_raster(page)
 
-        # Extract coordinates for the current page
-        coordinates = []
-        for contour in contours:
-            x, y, w, h = cv2.boundingRect(contour)
-            coordinates.append((x, y, w, h))
+        coordinates = detect_page_glyphs(page, np_page_image)
 
         if not coordinates:
             print(f"No contours found on page {page_num}.")
-            all_coordinates.append([])
-            all_row_mappings.append([])
+            yield page_num, [], []
             continue
 
-        # Sort coordinates by y-axis (rows)
-        coordinates_sorted_by_y = sorted(coordinates, key=lambda item: item[1])
-
-        # Create row mapping for the current page
-        row_mapping = create_mapping(coordinates_sorted_by_y, aspect_ratio_threshold, is_row=True)
-
-        # Adjust row numbers to continue from the last row number of the previous page
-        adjusted_row_mapping = []
-        for num, lower_limit, upper_limit in row_mapping:
-            adjusted_row_mapping.append((num + last_row_number, lower_limit, upper_limit))
+        adjusted_row_mapping = build_row_mapping(coordinates, aspect_ratio_threshold, last_row_number)
 
         # Update last_row_number for the next page
         last_row_number = adjusted_row_mapping[-1][0] if adjusted_row_mapping else last_row_number
 
-        # Store coordinates and row mapping for the current page
-        all_coordinates.append(coordinates)
-        all_row_mappings.append(adjusted_row_mapping)
-
         # Print row mapping and coordinates for the current page
         print(f"Page {page_num} Row Mapping:", adjusted_row_mapping)
         print(f"Page {page_num} Coordinates:", coordinates)
 
-        # Process and save alphabet regions for the current page
-        for (x, y, w, h) in coordinates:
-            if h / w > aspect_ratio_threshold:
-                continue
+        if not lazy:
+            save_alphabet_regions(np_page_image, page_num, coordinates, adjusted_row_mapping, output_folder,
+                                  aspect_ratio_threshold, page, crop_mode, enhancement)
 
-            row_num = assign_number(y, adjusted_row_mapping)
+        yield page_num, coordinates, adjusted_row_mapping
 
-            if row_num == -1:
-                continue
+# ----------------------------------------------------------------------------------------------------------
+
+def get_extraction_workers(workers=None):
+    """Number of page workers: explicit value, EXTRACTION['workers'], or the CPU budget's pool size"""
+    if workers is None:
+        workers = EXTRACTION['workers']
+    if workers is None:
+        workers = get_cpu_budget()['pool_workers']
+    return max(1, int(workers))
+
+# One fitz document handle per pool worker
+_WORKER_DOCUMENT = {}
+
+def _init_page_worker(pdf_path, raster_key, paths, extraction):
+    # Spawned workers import a fresh config, paths and settings changed at runtime are passed along
+    PATHS.update(paths)
+    EXTRACTION.update(extraction)
+    configure_pool_worker()
+    _WORKER_DOCUMENT['document'] = fitz.open(pdf_path)
+    # Workers share the parent's page rasters, under the hash it already computed
+    EXTRACTION['page_raster_cache'] = raster_key is not None
+    if raster_key is not None:
+        remember_pdf_raster_key(pdf_path, raster_key)
+
+def _detect_page(page_num):
+    page = _WORKER_DOCUMENT['document'].load_page(page_num)
+    return detect_page_glyphs(page)
+
+def _save_page(page_num, coordinates, row_mapping, output_folder, aspect_ratio_threshold, crop_mode, enhancement):
+    page = _WORKER_DOCUMENT['document'].load_page(page_num)
+    # Detection already rendered the page into the raster cache, virtual crops need its size for their bands
+    np_page_image = load_page_raster(page)
+    save_alphabet_regions(np_page_image, page_num, coordinates, row_mapping, output_folder, aspect_ratio_threshold,
+                          page, crop_mode, enhancement)
+    return page_num
 
-            alphabet_region = np_page_image[y:y+h, x:x+w]
-            enlarged_region = enlarge_image(alphabet_region)
-            enhanced_region = enhance_quality(enlarged_region)
+def iter_extract_alphabets_parallel(pdf_path, page_count, output_folder, aspect_ratio_threshold, workers, crop_mode, lazy,
+                                    enhancement, page_nums):
+    """
+    Process-pool version of iter_extract_alphabets.
 
-            if w < 6 and h < 6:
+    Row numbers continue across pages, so a page's numbering depends on the
+    row count of every page before it. Pages are therefore processed in two
+    parallel passes: glyph detection first, then (once the row offsets are
+    known) crop enhancement and saving, which is where the time goes.
+    Pages are still yielded in order, pages outside page_nums with empty lists.
+    """
+    pages = []
+    last_row_number = 0
+    raster_key = pdf_raster_key(pdf_path) if page_raster_cache_enabled() else None
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(page_nums)), mp_context=get_context('spawn'),
+                             initializer=_init_page_worker,
+                             initargs=(pdf_path, raster_key, dict(PATHS), dict(EXTRACTION))) as executor:
+        page_coordinates = dict(zip(page_nums, executor.map(_detect_page, page_nums)))
+
+        # Stitch pages back in order and renumber rows cumulatively
+        for page_num in range(page_count):
+            if page_num not in page_coordinates:
+                pages.append((page_num, [], [], None))
                 continue
 
-            base_filename = f"{page_num}_row{row_num}_x{x}_y{y}_w{w}_h{h}"
-            counter = 1
-            filename = f"{base_filename}.png"
-            while os.path.exists(os.path.join(output_folder, filename)):
-                filename = f"{base_filename}_{counter}.png"
-                counter += 1
+            coordinates = page_coordinates[page_num]
+            if not coordinates:
+                print(f"No contours found on page {page_num}.")
+                pages.append((page_num, [], [], None))
+                continue
 
-            alphabet_image = Image.fromarray(enhanced_region)
-            alphabet_image.save(os.path.join(output_folder, filename))
-    
-    return all_coordinates, all_row_mappings
+            adjusted_row_mapping = build_row_mapping(coordinates, aspect_ratio_threshold, last_row_number)
+            last_row_number = adjusted_row_mapping[-1][0] if adjusted_row_mapping else last_row_number
+
+            print(f"Page {page_num} Row Mapping:", adjusted_row_mapping)
+            print(f"Page {page_num} Coordinates:", coordinates)
+
+            future = None
+            if not lazy:
+                future = executor.submit(_save_page, page_num, coordinates, adjusted_row_mapping,
+                                         output_folder, aspect_ratio_threshold, crop_mode, enhancement)
+            pages.append((page_num, coordinates, adjusted_row_mapping, future))
+
+        for page_num, coordinates, row_mapping, future in pages:
+            if future is not None:
+                future.result()
+            yield page_num, coordinates, row_mapping
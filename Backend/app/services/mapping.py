@@ -1,15 +1,17 @@
-import os
-from collections import defaultdict
+from bisect import bisect_right
 
-from app.services.filename_utils import get_image_details_with_row
-from ..config import PATHS
+import numpy as np
 
-def create_mapping(coordinates, aspect_ratio_threshold, is_row=True):
-    mapping = []
-    number = 1
+def is_articulation(w, h):
+    # Written with & so it also works element-wise on numpy arrays
+    return (4 < h) & (h < 9) & (w > 9)
 
+def create_mapping(coordinates, aspect_ratio_threshold, is_row=True):
     if not coordinates:
-        return mapping
+        return []
+
+    # [lower_limit, upper_limit] of each interval, the last one is extended in place
+    intervals = []
 
     for x, y, w, h in coordinates:
         # Skip if width or height is zero to avoid division errors
@@ -27,20 +29,13 @@ def create_mapping(coordinates, aspect_ratio_threshold, is_row=True):
             coord = x
             size = w
 
-        if not mapping:
-            upper_limit = coord + int(size / 2)
-            lower_limit = coord
-            mapping.append((number, lower_limit, upper_limit))
-        elif mapping and coord > mapping[-1][2]:
-            number += 1
-            lower_limit = coord
-            upper_limit = coord + int(size / 2)
-            mapping.append((number, lower_limit, upper_limit))
+        upper_limit = coord + int(size / 2)
+        if intervals and coord <= intervals[-1][1]:
+            intervals[-1][1] = max(intervals[-1][1], upper_limit)
         else:
-            upper_limit = max(mapping[-1][2], coord + int(size / 2))
-            mapping[-1] = (number, mapping[-1][1], upper_limit)
+            intervals.append([coord, upper_limit])
 
-    return mapping
+    return [(number, lower_limit, upper_limit) for number, (lower_limit, upper_limit) in enumerate(intervals, start=1)]
 
 def assign_number(coord, mapping):
     for num, lower_limit, upper_limit in mapping:
@@ -48,76 +43,67 @@ def assign_number(coord, mapping):
             return num
     return -1
 
-
-def get_row_image_counts(folder_path):
+class IntervalIndex:
     """
-    Calculate the number of images for each row in the folder.
-
-    Args:
-        folder_path (str): Path to the folder containing segmented images.
+    Lookup index over a (num, lower_limit, upper_limit) mapping with inclusive limits.
 
-    Returns:
-        dict: A dictionary where keys are row numbers and values are the number of images in that row.
+    Mappings from create_mapping are sorted and disjoint, so a coordinate is
+    looked up by binary search over the lower limits. Overlapping mappings fall
+    back to scanning, so the result always equals assign_number's: the number of
+    the first interval in mapping order that contains the coordinate, or -1.
     """
-    # Dictionary to store the count of images for each row
-    row_image_count = defaultdict(int)
-
-    # Iterate through all files in the folder
-    for filename in os.listdir(folder_path):
-        # Check if the file matches the expected format
-        if filename.endswith(".png"):  # Assuming images are in PNG format
-            # Extract row number from the filename
-            try:
-                parts = filename.split("_")
-                row_num = int(parts[1].replace("row", ""))  # Extract row number
-            except (IndexError, ValueError):
-                # Skip files that don't match the expected format
-                continue
-
-            # Increment the count for this row
-            row_image_count[row_num] += 1
-
-    return row_image_count
 
-
-#-------------------------------------- x --------------------------------------#
-from collections import defaultdict
-import os
-
-def get_row_image_counts(folder_path):
-    """
-    Calculate the number of images for each row in the folder.
-
-    Args:
-        folder_path (str): Path to the folder containing segmented images.
-
-    Returns:
-        dict: A dictionary where keys are row numbers and values are the number of images in that row.
-    """
-    # Dictionary to store the count of images for each row
-    row_image_count = defaultdict(int)
-
-    # Iterate through all files in the folder
-    for filename in os.listdir(folder_path):
-        # Check if the file matches the expected format
-        if filename.endswith(".png"):  # Assuming images are in PNG format
-            # Extract row number from the filename
-            try:
-                parts = filename.split("_")
-                row_num = int(parts[1].replace("row", ""))  # Extract row number
-            except (IndexError, ValueError):
-                # Skip files that don't match the expected format
-                continue
-
-            # Increment the count for this row
-            row_image_count[row_num] += 1
-
-    return row_image_count
+    def __init__(self, mapping):
+        self.mapping = [tuple(interval) for interval in mapping]
+        numbers = np.array([num for num, _, _ in self.mapping], dtype=np.int64)
+        lower_limits = np.array([lower for _, lower, _ in self.mapping], dtype=np.int64)
+        upper_limits = np.array([upper for _, _, upper in self.mapping], dtype=np.int64)
+
+        order = np.argsort(lower_limits, kind='stable')
+        self.numbers = numbers[order]
+        self.lower_limits = lower_limits[order]
+        self.upper_limits = upper_limits[order]
+        self.disjoint = bool(np.all(self.lower_limits[1:] > self.upper_limits[:-1]))
+
+        # Plain lists for single lookups, bisect on them beats numpy scalar overhead
+        self._lower_list = self.lower_limits.tolist()
+        self._upper_list = self.upper_limits.tolist()
+        self._number_list = self.numbers.tolist()
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def lookup(self, coord):
+        """Number of the interval containing coord, -1 if none"""
+        if not self.disjoint:
+            return assign_number(coord, self.mapping)
+        i = bisect_right(self._lower_list, coord) - 1
+        if i >= 0 and coord <= self._upper_list[i]:
+            return self._number_list[i]
+        return -1
+
+    def lookup_many(self, coords):
+        """Vectorized lookup: int64 array of interval numbers, -1 where none contains the coord"""
+        coords = np.asarray(coords, dtype=np.int64)
+        numbers = np.full(coords.shape, -1, dtype=np.int64)
+        if not self.mapping:
+            return numbers
+
+        if not self.disjoint:
+            # Later intervals are written first so the first match wins, as in assign_number
+            for num, lower_limit, upper_limit in reversed(self.mapping):
+                numbers[(lower_limit <= coords) & (coords <= upper_limit)] = num
+            return numbers
+
+        i = np.searchsorted(self.lower_limits, coords, side='right') - 1
+        found = i >= 0
+        found[found] = coords[found] <= self.upper_limits[i[found]]
+        numbers[found] = self.numbers[i[found]]
+        return numbers
 
 # ------------------------------------------------------------------------------------------------------
 
-from app.services.filename_utils import get_image_details_with_row, update_filename_with_col_or_suffix
-from app.config import PATHS
+from app.services.glyph_index import query_glyphs, set_glyph_columns, mark_glyphs_extra, reset_glyph_columns
 
 def find_general_boundaries(coordinates):
     min_x = min(coordinates, key=lambda item: item[3])[3]
@@ -171,18 +157,13 @@ def find_first_valid_row(coordinates, row_mapping, subgroup_lower_bound):
 
 #-------------------------------------- x --------------------------------------#
 def assign_column_numbers(all_row_mappings, first_row, sam_and_taalis_rows, aspect_ratio_threshold=1.6):
-    composition_folder  = PATHS['working_composition']
-    images = os.listdir(composition_folder)
-    coordinates = []
+    # Columns are recorded in the glyph index, assigning them again starts over
+    reset_glyph_columns()
+    coordinates = [
+        (image, page_num, row_num, x, y, w, h) for image, page_num, row_num, _, x, y, w, h, _ in query_glyphs()
+    ]
     subgroup_ranges = []  # Store subgroup ranges
 
-    # Filter images within the start_row and end_row range
-    for image in images:
-        details = get_image_details_with_row(image)
-        if details:
-            page_num, row_num, x, y, w, h = details
-            coordinates.append((image, page_num, row_num, x, y, w, h))
-
     # Flatten row_mapping for the rows within the range
     flattened_row_mapping = []
     for row_mapping in all_row_mappings:
@@ -221,7 +202,7 @@ def assign_column_numbers(all_row_mappings, first_row, sam_and_taalis_rows, aspe
         for image, page_num, row_num, x, y, w, h in subgroup_coords:
             if row_num < first_valid_row_in_subgroup:
                 invalid_rows.append(image)
-                update_filename_with_col_or_suffix(composition_folder, image, "extra")
+        mark_glyphs_extra(invalid_rows)
         
         # Filter out invalid rows
         valid_subgroup_coords = [
@@ -240,10 +221,11 @@ def assign_column_numbers(all_row_mappings, first_row, sam_and_taalis_rows, aspe
         ]
 
         column_mapping = create_mapping(valid_subgroup_coords_mapping, aspect_ratio_threshold, is_row=False)
+        col_nums = IntervalIndex(column_mapping).lookup_many([x for x, _, _, _ in valid_subgroup_coords_mapping])
 
-        for image, page_num, row_num, x, y, w, h in valid_subgroup_coords_sorted_by_x:
-            col_num = assign_number(x, column_mapping)
-            if col_num != -1:
-                update_filename_with_col_or_suffix(composition_folder, image, f"col{col_num}")
+        set_glyph_columns(
+            (image, col_num) for (image, _, _, _, _, _, _), col_num in zip(valid_subgroup_coords_sorted_by_x, col_nums.tolist())
+            if col_num != -1
+        )
         
     return subgroup_ranges
@@ -0,0 +1,180 @@
+"""
+Export the Keras swar classifier to a lightweight runtime and check that the
+export agrees with the original model.
+
+    python -m app.services.model_export tflite [--quantize]
+    python -m app.services.model_export onnx
+    python -m app.services.model_export parity tflite
+
+Run from the Backend folder. Exporting needs TensorFlow (and tf2onnx for
+ONNX); serving the export afterwards does not.
+"""
+import argparse
+import json
+import os
+
+import cv2
+import numpy as np
+
+from app.config import PATHS
+from app.services.image_processing import preprocess_arrays_to_predict
+from app.services.model_registry import _load_keras_model, get_runtime_model_path, load_runtime_model
+
+# Folders whose crops are used for calibration and parity checks
+CROP_FOLDERS = [
+    PATHS['working_composition'],
+    PATHS['working_composition_segmented'],
+    PATHS['initial_segmentation'],
+]
+
+
+def load_crop_batch(folders=None, limit=None):
+    """Load and preprocess the existing .png crops into one (N, 32, 32) batch"""
+    image_paths = []
+    for folder in folders or CROP_FOLDERS:
+        if not os.path.isdir(folder):
+            continue
+        image_paths.extend(
+            os.path.join(folder, filename) for filename in sorted(os.listdir(folder))
+            if filename.endswith('.png')
+        )
+    if limit:
+        image_paths = image_paths[:limit]
+
+    images = [cv2.imread(path, cv2.IMREAD_GRAYSCALE) for path in image_paths]
+    kept = [(image, path) for image, path in zip(images, image_paths) if image is not None]
+    if not kept:
+        return np.empty((0, 32, 32), dtype=np.uint8), []
+    images, image_paths = zip(*kept)
+    return preprocess_arrays_to_predict(list(images), list(image_paths)), list(image_paths)
+
+
+def export_tflite(model_path=None, output_path=None, quantize=False, calibration_folders=None):
+    """
+    Convert the Keras model to TFLite.
+
+    With quantize=True weights and activations are quantized to int8 using the
+    existing crops as the representative dataset; inputs and outputs stay float.
+    """
+    import tensorflow as tf
+
+    model_path = model_path or PATHS['model']
+    output_path = output_path or PATHS['model_tflite']
+
+    model = _load_keras_model(model_path)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if quantize:
+        calibration, _ = load_crop_batch(calibration_folders, limit=500)
+        if not len(calibration):
+            raise ValueError("Quantization needs crops in the output folders for calibration")
+        input_rank = len(model.input_shape)
+
+        def representative_dataset():
+            for image in calibration:
+                sample = np.expand_dims(image, axis=0).astype(np.float32)
+                if sample.ndim == input_rank - 1:
+                    sample = np.expand_dims(sample, axis=-1)
+                yield [sample]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+
+    tflite_model = converter.convert()
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+
+    print(f"Exported {model_path} to {output_path} ({len(tflite_model)} bytes)")
+    return output_path
+
+
+def export_onnx(model_path=None, output_path=None):
+    """Convert the Keras model to an ONNX graph that cv2.dnn can run"""
+    import tensorflow as tf
+    try:
+        import tf2onnx
+    except ImportError:
+        raise ImportError("ONNX export needs the tf2onnx package: pip install tf2onnx")
+
+    model_path = model_path or PATHS['model']
+    output_path = output_path or PATHS['model_onnx']
+
+    model = _load_keras_model(model_path)
+    input_signature = [tf.TensorSpec(model.input_shape, tf.float32, name='input')]
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tf2onnx.convert.from_keras(model, input_signature=input_signature, output_path=output_path)
+
+    print(f"Exported {model_path} to {output_path} (input rank {len(model.input_shape)})")
+    return output_path
+
+
+def check_parity(runtime, crop_folders=None, limit=None, batch_size=64):
+    """
+    Compare an exported runtime against the Keras model on the existing crops.
+
+    Returns:
+        dict with the number of crops, top-1 agreement, the largest absolute
+        probability difference and the crops whose predicted class differs.
+    """
+    images, image_paths = load_crop_batch(crop_folders, limit)
+    if not len(images):
+        raise ValueError("No crops found to compare against")
+
+    keras_model = _load_keras_model(PATHS['model'])
+    export_model = load_runtime_model(runtime, get_runtime_model_path(runtime))
+
+    keras_outputs, export_outputs = [], []
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        keras_outputs.append(np.asarray(keras_model.predict_on_batch(batch)))
+        export_outputs.append(np.asarray(export_model.predict_on_batch(batch)))
+    keras_outputs = np.concatenate(keras_outputs).reshape(len(images), -1)
+    export_outputs = np.concatenate(export_outputs).reshape(len(images), -1)
+
+    keras_classes = np.argmax(keras_outputs, axis=1)
+    export_classes = np.argmax(export_outputs, axis=1)
+    mismatched = np.flatnonzero(keras_classes != export_classes)
+
+    return {
+        'runtime': runtime,
+        'crops': len(images),
+        'top1_agreement': float(1 - len(mismatched) / len(images)),
+        'max_abs_probability_diff': float(np.max(np.abs(keras_outputs - export_outputs))),
+        'mismatches': [
+            {
+                'path': image_paths[i],
+                'keras_class': int(keras_classes[i]),
+                'export_class': int(export_classes[i]),
+            }
+            for i in mismatched
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the swar classifier to a lightweight runtime")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    tflite_parser = subparsers.add_parser('tflite', help="Export to TFLite")
+    tflite_parser.add_argument('--quantize', action='store_true', help="int8 quantization calibrated on existing crops")
+    tflite_parser.add_argument('--output', default=None)
+
+    onnx_parser = subparsers.add_parser('onnx', help="Export to ONNX for cv2.dnn")
+    onnx_parser.add_argument('--output', default=None)
+
+    parity_parser = subparsers.add_parser('parity', help="Compare an export against the Keras model")
+    parity_parser.add_argument('runtime', choices=['tflite', 'onnx'])
+    parity_parser.add_argument('--limit', type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == 'tflite':
+        export_tflite(output_path=args.output, quantize=args.quantize)
+    elif args.command == 'onnx':
+        export_onnx(output_path=args.output)
+    else:
+        print(json.dumps(check_parity(args.runtime, limit=args.limit), indent=4))
+
+
+if __name__ == '__main__':
+    main()
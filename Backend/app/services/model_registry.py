@@ -0,0 +1,212 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from app.config import INFERENCE, PATHS
+
+# Process-wide classifier shared by every caller in this worker
+_MODEL_REGISTRY = {
+    'model': None,
+    'runtime': None,
+    'path': None,
+    'mtime': None,
+}
+_MODEL_LOCK = threading.Lock()
+
+# Model file used by each inference runtime
+RUNTIME_MODEL_PATHS = {
+    'keras': 'model',
+    'tflite': 'model_tflite',
+    'onnx': 'model_onnx',
+}
+
+
+def _load_keras_model(model_path):
+    """Load the Keras classifier from disk"""
+    from tensorflow.keras.models import load_model
+
+    try:
+        return load_model(model_path)
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        raise
+
+
+def _match_input_rank(batch, rank):
+    """Add the trailing channel axis when the exported graph expects NHWC input"""
+    batch = np.asarray(batch, dtype=np.float32)
+    if batch.ndim == rank - 1:
+        batch = np.expand_dims(batch, axis=-1)
+    return batch
+
+
+class TFLiteClassifier:
+    """Runs an exported .tflite classifier without importing tensorflow.keras"""
+
+    def __init__(self, model_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            # Fall back to the interpreter bundled with the full TensorFlow package
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.lock = threading.Lock()
+
+    def predict_on_batch(self, batch):
+        batch = _match_input_rank(batch, len(self.input_details['shape']))
+        input_index = self.input_details['index']
+
+        scale, zero_point = self.input_details['quantization']
+        input_dtype = self.input_details['dtype']
+        if input_dtype != np.float32:
+            # Fully quantized graph: map float pixels onto the integer input range
+            info = np.iinfo(input_dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(input_dtype)
+
+        with self.lock:
+            if tuple(self.input_details['shape']) != batch.shape:
+                self.interpreter.resize_tensor_input(input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self.input_details = self.interpreter.get_input_details()[0]
+                self.output_details = self.interpreter.get_output_details()[0]
+            self.interpreter.set_tensor(input_index, batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output_details['index']).copy()
+
+        scale, zero_point = self.output_details['quantization']
+        if self.output_details['dtype'] != np.float32:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    def predict(self, batch, **kwargs):
+        return self.predict_on_batch(batch)
+
+
+class OnnxClassifier:
+    """Runs an exported ONNX classifier through OpenCV's dnn module"""
+
+    def __init__(self, model_path):
+        import cv2
+
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.input_rank = INFERENCE.get('onnx_input_rank', 3)
+        self.lock = threading.Lock()
+
+    def predict_on_batch(self, batch):
+        batch = _match_input_rank(batch, self.input_rank)
+        with self.lock:
+            self.net.setInput(batch)
+            return np.array(self.net.forward())
+
+    def predict(self, batch, **kwargs):
+        return self.predict_on_batch(batch)
+
+
+def load_runtime_model(runtime, model_path):
+    """Load the classifier for the given runtime ('keras', 'tflite' or 'onnx')"""
+    if runtime == 'keras':
+        return _load_keras_model(model_path)
+    if runtime == 'tflite':
+        from app.services.cpu_budget import get_cpu_budget
+
+        return TFLiteClassifier(model_path, num_threads=get_cpu_budget()['tf_intra_op_threads'])
+    if runtime == 'onnx':
+        return OnnxClassifier(model_path)
+    raise ValueError(f"Unknown inference runtime: {runtime}")
+
+
+def get_runtime_model_path(runtime=None):
+    """Return the model file used by the configured (or given) runtime"""
+    runtime = runtime or INFERENCE['runtime']
+    if runtime not in RUNTIME_MODEL_PATHS:
+        raise ValueError(f"Unknown inference runtime: {runtime}")
+    return PATHS[RUNTIME_MODEL_PATHS[runtime]]
+
+
+def _is_stale(runtime, model_path):
+    """Check whether the cached model no longer matches the configured file on disk"""
+    if (_MODEL_REGISTRY['model'] is None or _MODEL_REGISTRY['runtime'] != runtime
+            or _MODEL_REGISTRY['path'] != model_path):
+        return True
+    if not INFERENCE.get('hot_swap_model'):
+        return False
+    try:
+        return os.path.getmtime(model_path) != _MODEL_REGISTRY['mtime']
+    except OSError:
+        # Keep serving the loaded model while the file is being replaced
+        return False
+
+
+def get_model():
+    """
+    Return the classifier for this process, loading it on first use.
+
+    INFERENCE['runtime'] selects the Keras model or one of the lightweight
+    exports (see model_export.py). With INFERENCE['hot_swap_model'] enabled
+    the model is reloaded whenever its file changes on disk.
+    """
+    runtime = INFERENCE['runtime']
+    model_path = get_runtime_model_path(runtime)
+    if not _is_stale(runtime, model_path):
+        return _MODEL_REGISTRY['model']
+
+    with _MODEL_LOCK:
+        # Another thread may have loaded it while we waited for the lock
+        if not _is_stale(runtime, model_path):
+            return _MODEL_REGISTRY['model']
+
+        mtime = os.path.getmtime(model_path) if os.path.exists(model_path) else None
+        model = load_runtime_model(runtime, model_path)
+        print(f"Loaded {runtime} classifier from {model_path}")
+
+        _MODEL_REGISTRY['model'] = model
+        _MODEL_REGISTRY['runtime'] = runtime
+        _MODEL_REGISTRY['path'] = model_path
+        _MODEL_REGISTRY['mtime'] = mtime
+        return model
+
+
+def reload_model():
+    """Drop the cached classifier so the next call to get_model loads it again"""
+    with _MODEL_LOCK:
+        _MODEL_REGISTRY['model'] = None
+        _MODEL_REGISTRY['runtime'] = None
+        _MODEL_REGISTRY['path'] = None
+        _MODEL_REGISTRY['mtime'] = None
+
+
+# File fingerprints keyed by (path, mtime, size) so unchanged files are hashed once
+_FILE_DIGESTS = {}
+
+
+def _file_digest(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 'missing'
+
+    fingerprint = (path, stat.st_mtime, stat.st_size)
+    if fingerprint not in _FILE_DIGESTS:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _FILE_DIGESTS[fingerprint] = digest.hexdigest()
+    return _FILE_DIGESTS[fingerprint]
+
+
+def get_model_version():
+    """
+    Identify the classifier currently on disk together with its class list.
+    Changes whenever the runtime, its model file or classes.json changes.
+    """
+    runtime = INFERENCE['runtime']
+    model_digest = _file_digest(get_runtime_model_path(runtime))
+    classes_digest = _file_digest(PATHS['classes'])
+    return hashlib.sha256(f"{runtime}:{model_digest}:{classes_digest}".encode()).hexdigest()[:16]
@@ -1,14 +1,16 @@
 import os
-from filename_utils import get_row_and_col_number
 from app.config import PATHS
+from app.services.glyph_index import query_glyphs
+
+def get_row_and_col_number(glyph):
+    """(row_num, col_num) of a glyph index entry"""
+    return glyph[2], glyph[3]
 
 def update_subgroups(subgroups):
     """
     Processes subgroups by checking if the first subgroup needs to be split into two.
     """
-    composition_folder = PATHS['working_composition']
-    images = os.listdir(composition_folder)
-    images.sort(key=lambda x: get_row_and_col_number(x)[0])  # Sort by row number
+    images = query_glyphs()  # Sorted by row number
     
     first_subgroup_start, first_subgroup_end = subgroups[0]
     first_valid_row = first_subgroup_start
@@ -59,6 +61,8 @@ def pad_lists(lists, size):
 
 import cv2
 from save_and_load import load_lists_in_subgroups, save_word_segmented_images, save_lists_in_subgroups
+from app.services.crop_memory import remember_crop
+from app.services.crop_store import read_crop
 from segmentation import separate_articulation, segment_word
 
 def apply_articulation_segmentation(row_list, articulation_checks):
@@ -73,7 +77,7 @@ def apply_articulation_segmentation(row_list, articulation_checks):
     for i in range(len(row_list)):
         if not articulation_checks[i] and row_list[i]:  # Check if articulation is False and the list is not empty
             image_path = row_list[i][0]  # Get the image path
-            image = cv2.imread(image_path)   # Load the image
+            image = read_crop(image_path)   # Load the image
             if image is not None:
                 segmented_image, is_segmented = separate_articulation(image)
                 if is_segmented:
@@ -81,6 +85,8 @@ def apply_articulation_segmentation(row_list, articulation_checks):
 
                     # Save the segmented image with the original name
                     save_word_segmented_images(image_path, segmented_image, row_list, i)
+                else:
+                    remember_crop(image_path, image)
 
 def apply_word_segmentation(row_list, articulation_checks):
     """
@@ -108,31 +114,38 @@ def finalize_segmentation_and_lists():
     subgroup_results = load_lists_in_subgroups()
 
     for subgroup_range, results in subgroup_results.items():
-        swar_list = results['swar_list']
-        lyrics_list = results['lyrics_list']
-        swar_articulation_checks = results['swar_articulation_checks']
-        lyrics_articulation_checks = results['lyrics_articulation_checks']
-        
-        # Apply articulation segmentation to swar row
-        apply_articulation_segmentation(swar_list, swar_articulation_checks)
-        
-        # Apply articulation segmentation to lyrics row
-        apply_articulation_segmentation(lyrics_list, lyrics_articulation_checks)
-        
-        # Apply word segmentation to swar row
-        apply_word_segmentation(swar_list, swar_articulation_checks)
-        
-        # Apply word segmentation to lyrics row
-        apply_word_segmentation(lyrics_list, lyrics_articulation_checks)
-        
-        # Update the results
-        subgroup_results[subgroup_range]['swar_list'] = swar_list
-        subgroup_results[subgroup_range]['lyrics_list'] = lyrics_list
-        subgroup_results[subgroup_range]['swar_articulation_checks'] = swar_articulation_checks
-        subgroup_results[subgroup_range]['lyrics_articulation_checks'] = lyrics_articulation_checks
+        finalize_subgroup_lists(results)
 
     save_lists_in_subgroups(subgroup_results)
 
+def finalize_subgroup_lists(results):
+    """
+    Apply articulation separation and word segmentation to one subgroup (in place)
+    """
+    swar_list = results['swar_list']
+    lyrics_list = results['lyrics_list']
+    swar_articulation_checks = results['swar_articulation_checks']
+    lyrics_articulation_checks = results['lyrics_articulation_checks']
+    
+    # Apply articulation segmentation to swar row
+    apply_articulation_segmentation(swar_list, swar_articulation_checks)
+    
+    # Apply articulation segmentation to lyrics row
+    apply_articulation_segmentation(lyrics_list, lyrics_articulation_checks)
+    
+    # Apply word segmentation to swar row
+    apply_word_segmentation(swar_list, swar_articulation_checks)
+    
+    # Apply word segmentation to lyrics row
+    apply_word_segmentation(lyrics_list, lyrics_articulation_checks)
+    
+    # Update the results
+    results['swar_list'] = swar_list
+    results['lyrics_list'] = lyrics_list
+    results['swar_articulation_checks'] = swar_articulation_checks
+    results['lyrics_articulation_checks'] = lyrics_articulation_checks
+    return results
+
 # ------------------------------------------------------------------------------------------------
 
 def categorize_flatten_predictions(predictions, row_categories):
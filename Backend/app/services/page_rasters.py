@@ -0,0 +1,99 @@
+import os
+import shutil
+import threading
+
+import fitz
+import numpy as np
+
+from app.config import EXTRACTION, PATHS
+from app.services.extraction_cache import hash_pdf, folder_size
+
+# Rendered pages shared by extraction, annotation and later re-cropping: one
+# .npy file per page and zoom in a folder named by the hash of the PDF bytes,
+# read back memory-mapped, so pool workers and later stages share the pixels
+# without rendering or pickling them again. PDF folders are least recently
+# used first out once the cache grows past EXTRACTION['page_raster_cache_max_mb'].
+_PDF_HASHES = {}
+_RASTER_LOCK = threading.Lock()
+
+
+def page_raster_cache_enabled():
+    return bool(EXTRACTION['page_raster_cache'] and PATHS.get('page_rasters'))
+
+
+def render_page(page, zoom=1):
+    if zoom == 1:
+        page_image = page.get_pixmap()
+    else:
+        page_image = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    return np.frombuffer(page_image.samples, dtype=np.uint8).reshape((page_image.height, page_image.width, page_image.n))
+
+
+def pdf_raster_key(pdf_path):
+    """Hash of the PDF, computed once per file version in each process"""
+    stat = os.stat(pdf_path)
+    version = (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+    with _RASTER_LOCK:
+        if version not in _PDF_HASHES:
+            _PDF_HASHES[version] = hash_pdf(pdf_path)
+        return _PDF_HASHES[version]
+
+
+def remember_pdf_raster_key(pdf_path, key):
+    """Hand a pool worker the hash its parent already computed"""
+    stat = os.stat(pdf_path)
+    with _RASTER_LOCK:
+        _PDF_HASHES[(os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)] = key
+
+
+def load_page_raster(page, zoom=1):
+    """
+    Rendered page like render_page(page, zoom), from the raster cache when it
+    holds the page, else rendered and added to it. Read-only either way.
+    """
+    if not page_raster_cache_enabled() or not page.parent.name:
+        return render_page(page, zoom)
+
+    pdf_folder = os.path.join(PATHS['page_rasters'], pdf_raster_key(page.parent.name))
+    raster_path = os.path.join(pdf_folder, f"{page.number}_z{zoom}.npy")
+    try:
+        raster = np.load(raster_path, mmap_mode='r')
+        # Mark as recently used
+        os.utime(pdf_folder)
+        return np.asarray(raster)
+    except (FileNotFoundError, ValueError):
+        pass
+
+    np_page_image = render_page(page, zoom)
+    try:
+        new_pdf = not os.path.exists(pdf_folder)
+        os.makedirs(pdf_folder, exist_ok=True)
+        # Written under a temporary name and renamed, so other workers never map half a page
+        temp_path = f"{raster_path}.tmp-{os.getpid()}-{threading.get_ident()}.npy"
+        np.save(temp_path, np_page_image)
+        os.replace(temp_path, raster_path)
+        if new_pdf:
+            evict_page_rasters(keep=os.path.basename(pdf_folder))
+    except OSError as e:
+        # A full disk only costs the cache
+        print(f"Could not cache page {page.number} raster: {e}")
+    return np_page_image
+
+
+def evict_page_rasters(keep=None):
+    """Remove least recently used PDFs' rasters until the cache fits in EXTRACTION['page_raster_cache_max_mb']"""
+    cache_folder = PATHS['page_rasters']
+    entries = [(entry.stat().st_mtime, folder_size(entry.path), entry.name)
+               for entry in os.scandir(cache_folder) if entry.is_dir()]
+
+    total = sum(size for _, size, _ in entries)
+    max_bytes = EXTRACTION['page_raster_cache_max_mb'] * 1024 * 1024
+    for _, size, key in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        # Pages still mapped by a reader stay readable until it lets go
+        shutil.rmtree(os.path.join(cache_folder, key), ignore_errors=True)
+        total -= size
+        print(f"Evicted page rasters {key[:12]}")
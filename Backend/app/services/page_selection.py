@@ -0,0 +1,43 @@
+import fitz
+
+from app.services.save_data import save_rows_to_file, load_rows_from_file
+
+# Page range chosen at /upload, used by /get_initial_rows when the request has none
+PAGE_RANGE_FILE = "page_range"
+
+# Default thumbnail width in pixels, and the largest one served
+THUMBNAIL_WIDTH = 200
+MAX_THUMBNAIL_WIDTH = 600
+
+def get_page_count(pdf_path):
+    with fitz.open(pdf_path) as pdf_document:
+        return len(pdf_document)
+
+def render_page_thumbnail(pdf_path, page_num, width=THUMBNAIL_WIDTH):
+    """PNG bytes of a 0-based page scaled to width pixels, cheap enough to show the whole book"""
+    with fitz.open(pdf_path) as pdf_document:
+        page = pdf_document.load_page(page_num)
+        zoom = min(width, MAX_THUMBNAIL_WIDTH) / page.rect.width
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+        return pixmap.tobytes("png")
+
+def parse_page_range(start_page, end_page, page_count):
+    """
+    0-based page numbers of the 1-based, inclusive [start_page, end_page] range.
+
+    Either end may be None (first / last page). Raises ValueError for bounds
+    that are not integers or fall outside the document.
+    """
+    start_page = 1 if start_page in (None, '') else int(start_page)
+    end_page = page_count if end_page in (None, '') else int(end_page)
+    if not 1 <= start_page <= end_page <= page_count:
+        raise ValueError(f"Invalid page range {start_page}-{end_page} for a PDF with {page_count} pages")
+    return list(range(start_page - 1, end_page))
+
+def save_page_range(start_page, end_page):
+    save_rows_to_file({'start_page': start_page, 'end_page': end_page}, PAGE_RANGE_FILE)
+
+def load_page_range():
+    """(start_page, end_page) saved at /upload, (None, None) selects every page"""
+    page_range = load_rows_from_file(PAGE_RANGE_FILE)
+    return page_range.get('start_page'), page_range.get('end_page')
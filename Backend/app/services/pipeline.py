@@ -0,0 +1,81 @@
+import queue
+import threading
+
+from app.config import INFERENCE, PIPELINE
+from app.services.generators import (
+    generate_predictions_batched,
+    generate_predictions_sequential,
+    iter_lists_in_subgroups,
+    update_kann_swar_and_generate_meend_list,
+)
+from app.services.modifications import finalize_subgroup_lists
+from app.services.prediction_cache import get_cache_stats
+from app.services.save_and_load import save_lists_in_subgroups
+
+# Marks the end of the producer's output
+_DONE = object()
+
+
+def _segment_subgroups(subgroup_ranges, row_col_images, beat_count, segmented):
+    """Producer: run every segmentation stage on one subgroup at a time"""
+    try:
+        for subgroup_range, results in iter_lists_in_subgroups(subgroup_ranges, row_col_images, beat_count):
+            update_kann_swar_and_generate_meend_list(subgroup_range, results)
+            finalize_subgroup_lists(results)
+            segmented.put((subgroup_range, results))
+    except Exception as e:
+        segmented.put(e)
+    finally:
+        segmented.put(_DONE)
+
+
+def run_final_rows_pipeline(subgroup_ranges, row_col_images, beat_count):
+    """
+    Overlap segmentation with inference for /final_rows.
+
+    A producer thread runs generate_lists, the kann swar / meend update and
+    the articulation and word segmentation for each subgroup, and hands the
+    finished subgroup to the classifier while later subgroups are still being
+    segmented. OpenCV and TensorFlow both release the GIL, so the two stages
+    run concurrently. The subgroups and predictions are the same as running
+    the stages one after another over all subgroups.
+
+    Returns:
+        Tuple of (subgroup results, predictions), both keyed by subgroup range.
+        subgroups.json is written once at the end.
+    """
+    segmented = queue.Queue(maxsize=PIPELINE['final_rows_queue_size'])
+    producer = threading.Thread(
+        target=_segment_subgroups,
+        args=(subgroup_ranges, row_col_images, beat_count, segmented),
+        daemon=True,
+    )
+    producer.start()
+
+    subgroup_results = {}
+    predictions = {}
+    error = None
+    while True:
+        item = segmented.get()
+        if item is _DONE:
+            break
+        if isinstance(item, Exception):
+            error = item
+            continue
+
+        subgroup_range, results = item
+        subgroup_results[subgroup_range] = results
+        if INFERENCE['batched']:
+            predictions.update(generate_predictions_batched({subgroup_range: results}))
+        else:
+            predictions.update(generate_predictions_sequential({subgroup_range: results}))
+
+    producer.join()
+    if error is not None:
+        raise error
+
+    if INFERENCE['prediction_cache']:
+        print("Prediction cache:", get_cache_stats())
+
+    save_lists_in_subgroups(subgroup_results)
+    return subgroup_results, predictions
@@ -0,0 +1,168 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from app.config import INFERENCE
+from app.services.model_registry import get_model_version
+
+# Two-tier cache of classifier outputs keyed by the normalized 32x32 input:
+# a bounded in-memory LRU in front of an optional SQLite store on disk.
+_MEMORY = OrderedDict()
+_STATE = {
+    'version': None,
+    'disk': None,
+    'disk_path': None,
+}
+_STATS = {
+    'memory_hits': 0,
+    'disk_hits': 0,
+    'misses': 0,
+}
+_CACHE_LOCK = threading.Lock()
+
+
+def _open_disk_tier(version):
+    """Open (or reopen) the on-disk tier and drop rows from other model versions"""
+    disk_path = INFERENCE.get('prediction_cache_path')
+    if _STATE['disk'] is not None and _STATE['disk_path'] != disk_path:
+        _STATE['disk'].close()
+        _STATE['disk'] = None
+
+    if not disk_path:
+        return
+    if _STATE['disk'] is None:
+        conn = sqlite3.connect(disk_path, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key TEXT PRIMARY KEY, version TEXT, class_index INTEGER, probability REAL)"
+        )
+        _STATE['disk'] = conn
+        _STATE['disk_path'] = disk_path
+
+    _STATE['disk'].execute("DELETE FROM predictions WHERE version != ?", (version,))
+    _STATE['disk'].commit()
+
+
+def _current_version():
+    """Return the model version, invalidating both tiers when it has changed"""
+    version = get_model_version()
+    if version != _STATE['version'] or _STATE['disk_path'] != INFERENCE.get('prediction_cache_path'):
+        if version != _STATE['version']:
+            _MEMORY.clear()
+        _open_disk_tier(version)
+        _STATE['version'] = version
+    return version
+
+
+def _cache_key(image, version):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(version.encode())
+    digest.update(str(image.shape).encode())
+    digest.update(np.ascontiguousarray(image).tobytes())
+    return digest.hexdigest()
+
+
+def _remember(key, value):
+    _MEMORY[key] = value
+    _MEMORY.move_to_end(key)
+    while len(_MEMORY) > INFERENCE['prediction_cache_size']:
+        _MEMORY.popitem(last=False)
+
+
+def lookup_predictions(images):
+    """
+    Look up cached predictions for a batch of preprocessed images.
+
+    Args:
+        images: Array of shape (N, 32, 32) from preprocess_images_to_predict
+    Returns:
+        Tuple of (keys, class indices, probabilities, missing mask). Entries
+        where the mask is True still have to be run through the model.
+    """
+    count = len(images)
+    class_indices = np.zeros(count, dtype=np.int64)
+    probabilities = np.zeros(count, dtype=np.float32)
+    missing = np.ones(count, dtype=bool)
+
+    with _CACHE_LOCK:
+        version = _current_version()
+        keys = [_cache_key(image, version) for image in images]
+
+        disk_lookups = []
+        for i, key in enumerate(keys):
+            value = _MEMORY.get(key)
+            if value is not None:
+                _MEMORY.move_to_end(key)
+                class_indices[i], probabilities[i] = value
+                missing[i] = False
+                _STATS['memory_hits'] += 1
+            else:
+                disk_lookups.append(i)
+
+        if disk_lookups and _STATE['disk'] is not None:
+            wanted = list({keys[i] for i in disk_lookups})
+            found = {}
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(wanted), 500):
+                chunk = wanted[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = _STATE['disk'].execute(
+                    f"SELECT key, class_index, probability FROM predictions WHERE key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                found.update({key: (class_index, probability) for key, class_index, probability in rows})
+
+            for i in disk_lookups:
+                value = found.get(keys[i])
+                if value is not None:
+                    class_indices[i], probabilities[i] = value
+                    missing[i] = False
+                    _remember(keys[i], value)
+                    _STATS['disk_hits'] += 1
+
+        _STATS['misses'] += int(missing.sum())
+
+    return keys, class_indices, probabilities, missing
+
+
+def store_predictions(keys, class_indices, probabilities):
+    """Add freshly computed predictions to both cache tiers"""
+    entries = [(key, int(class_index), float(probability))
+               for key, class_index, probability in zip(keys, class_indices, probabilities)]
+    if not entries:
+        return
+
+    with _CACHE_LOCK:
+        for key, class_index, probability in entries:
+            _remember(key, (class_index, probability))
+
+        if _STATE['disk'] is not None:
+            _STATE['disk'].executemany(
+                "INSERT OR REPLACE INTO predictions (key, version, class_index, probability) VALUES (?, ?, ?, ?)",
+                [(key, _STATE['version'], class_index, probability) for key, class_index, probability in entries],
+            )
+            _STATE['disk'].commit()
+
+
+def get_cache_stats():
+    """Return hit/miss counters and the hit rate since the process started"""
+    with _CACHE_LOCK:
+        stats = dict(_STATS)
+        stats['memory_entries'] = len(_MEMORY)
+    lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+    stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+    return stats
+
+
+def clear_prediction_cache():
+    """Empty both tiers and reset the counters"""
+    with _CACHE_LOCK:
+        _MEMORY.clear()
+        if _STATE['disk'] is not None:
+            _STATE['disk'].execute("DELETE FROM predictions")
+            _STATE['disk'].commit()
+        for name in _STATS:
+            _STATS[name] = 0
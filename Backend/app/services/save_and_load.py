@@ -113,37 +113,31 @@ def load_row_categories(filename="row_categories.json"):
 # -----------------------------------------------------------------------------------------
 
 import os
-import re
 import cv2
 from app.config import PATHS
+from app.services.crop_memory import remember_crop
+from app.services.crop_store import write_crop
+from app.services.glyph_index import parse_glyph_filename
 
-def save_segment_swar_and_kann_swar(segment, part_type, original_filename):
+def save_segment_swar_and_kann_swar(segment, part_type, original_filename, col_num):
     """
     Function to save a segmented part and return its path.
     
     Parameters:
     - segment: The segmented image (enlarged by a factor of 3).
-    - subgroup_range: The subgroup range.
-    - col: The column number.
     - part_type: Type of segment ('upper' or 'lower').
     - original_filename: The original filename of the image before segmentation.
+    - col_num: The column number, from the glyph index.
     
     Returns:
     - Path to the saved segment.
     """
     # Extract original image details from the filename
-    pattern = r'(\d+)_row(\d+)_col(\d+)_x(\d+)_y(\d+)_w(\d+)_h(\d+)'
-    match = re.match(pattern, original_filename)
-    if not match:
+    details = parse_glyph_filename(original_filename)
+    if not details:
         raise ValueError(f"Original filename {original_filename} does not match the expected pattern.")
     
-    page_num = match.group(1)
-    row_num = match.group(2)
-    col_num = match.group(3)
-    original_x = int(match.group(4))  # x-coordinate (pre-enlarged)
-    original_y = int(match.group(5))  # y-coordinate (pre-enlarged)
-    original_w = int(match.group(6))  # width (pre-enlarged)
-    original_h = int(match.group(7))  # height (pre-enlarged)
+    page_num, row_num, _, original_x, original_y, original_w, original_h, _ = details  # pre-enlarged
     
     # Calculate new coordinates for the segmented part (scaled down by a factor of 3)
     if part_type == 'upper':
@@ -168,7 +162,8 @@ def save_segment_swar_and_kann_swar(segment, part_type, original_filename):
     composition_segmented_folder = os.path.normpath(PATHS['working_composition_segmented'])
     os.makedirs(composition_segmented_folder, exist_ok=True)
     segment_path = os.path.join(composition_segmented_folder, new_filename)
-    cv2.imwrite(segment_path, segment)
+    write_crop(segment_path, segment)
+    remember_crop(segment_path, segment)
     
     return segment_path
 
@@ -234,7 +229,8 @@ def save_kann_swar_segment_from_meend(segment, subgroup_range, index, part_type)
     
     segment_filename = f"{subgroup_range[0]}_{subgroup_range[1]}_{index}_{part_type}.png"
     segment_path = os.path.join(composition_segmented_folder, segment_filename)
-    cv2.imwrite(segment_path, segment)
+    write_crop(segment_path, segment)
+    remember_crop(segment_path, segment)
     
     return segment_path
 
@@ -257,27 +253,21 @@ def save_word_segmented_images(original_path, segmented_image, target_list, inde
 
     original_name = os.path.basename(original_path)
     seg_image_path = os.path.normpath(os.path.join(composition_segmented_folder, original_name))
-    cv2.imwrite(seg_image_path, segmented_image)
+    write_crop(seg_image_path, segmented_image)
+    remember_crop(seg_image_path, segmented_image)
     target_list[index] = [seg_image_path]
 
 # ------------------------------------------------------------------------------------------------------------
 
 from datetime import datetime
-from tensorflow.keras.models import load_model
-from app.config import PATHS
+from app.services.model_registry import get_model
 
 def load_my_model():
-    """Simple model loader with basic error handling"""
-
-    model = PATHS['model']
-    try:
-        return load_model(model)
-    except Exception as e:
-        print(f"Error loading model: {e}")
-        raise
+    """Return the process-wide classifier (loaded once per worker)"""
+    return get_model()
 
 def load_classes():
-    with open('classes.json') as f:
+    with open(PATHS['classes']) as f:
         data = json.load(f)
     return data['classes']
 
@@ -93,6 +93,8 @@ def extract_alphabets(pdf_path, output_folder, aspect_ratio_threshold=3):
 from identifications import check_articulation
 from save_and_load import save_segment_swar_and_kann_swar
 from image_processing import crop_white_background
+from app.services.crop_memory import remember_crop
+from app.services.crop_store import read_crop, write_crop
 
 def find_separation_line_swar_and_kann_swar(binary_image, image_height):
     """Find the optimal separation line in a binary image."""
@@ -115,10 +117,11 @@ def segment_swar_and_kann_swar(img, subgroup_range, col):
     x, y, w, h, image_path = img
     
     # Load and check articulation
-    outlier_image = cv2.imread(image_path)
+    outlier_image = read_crop(image_path)
     is_articulated = check_articulation(outlier_image)
     
     if is_articulated:
+        remember_crop(image_path, outlier_image)
         return [image_path], []  # swar_list, kann_swar_list
     
     # Process image to find separation
@@ -142,8 +145,8 @@ def segment_swar_and_kann_swar(img, subgroup_range, col):
     # Save segments
     original_filename = os.path.basename(image_path)
     
-    upper_part_path = save_segment_swar_and_kann_swar(upper_part_cropped, 'upper', original_filename)
-    lower_part_path = save_segment_swar_and_kann_swar(lower_part_cropped, 'lower', original_filename)
+    upper_part_path = save_segment_swar_and_kann_swar(upper_part_cropped, 'upper', original_filename, col)
+    lower_part_path = save_segment_swar_and_kann_swar(lower_part_cropped, 'lower', original_filename, col)
     
     return [lower_part_path], [upper_part_path]  # swar_list, kann_swar_list
 
@@ -174,7 +177,7 @@ def segment_meend_and_kann_swar(image_path):
     - mid_part: Mid part of the image (meend).
     - right_part: Right part of the image (kann swar or None).
     """
-    image = cv2.imread(image_path)
+    image = read_crop(image_path)
     if image is None:
         return None, None, None
 
@@ -361,7 +364,7 @@ def merge_broken_segments(segments):
 # Function to process a single image, segment, and save the results in the provided folder
 def segment_word(image_path, output_folder):
     # Load the image
-    img = cv2.imread(image_path)
+    img = read_crop(image_path)
     if img is None:
         return []
     
@@ -376,7 +379,8 @@ def segment_word(image_path, output_folder):
     segmented_paths = []
     for i, segmented_image in enumerate(final_images):
         seg_image_path = os.path.normpath(os.path.join(output_folder, f'{image_base_name}_seg{i+1}.png'))
-        cv2.imwrite(seg_image_path, segmented_image)
+        write_crop(seg_image_path, segmented_image)
+        remember_crop(seg_image_path, segmented_image)
         segmented_paths.append(seg_image_path)
     
     return segmented_paths
\ No newline at end of file
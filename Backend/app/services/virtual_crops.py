@@ -0,0 +1,93 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import fitz
+
+from app.config import EXTRACTION
+from app.services.initial_extraction import acquire_regions, enhance_band, slice_enhanced_band
+from app.services.page_rasters import load_page_raster
+
+# Pixels of virtual crops (see crop_store.store_virtual_crops), keyed by the
+# path the region was first recorded under, least recently used first out
+_CROPS = OrderedDict()
+# Pages the crops are cut from and the enhanced bands ('row' and 'page'
+# enhancement) they are sliced out of: stages walk a composition row by row,
+# so the last few cover nearly every read
+_PAGES = OrderedDict()
+PAGE_CACHE_SIZE = 2
+_BANDS = OrderedDict()
+BAND_CACHE_SIZE = 8
+_DOCUMENTS = {}
+_VIRTUAL_LOCK = threading.Lock()
+
+
+def _lru_put(cache, key, value, size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _load_page(pdf_path, page_num):
+    """(rendered page, fitz page, key) through a small LRU of pages"""
+    # A PDF uploaded again under the same path is opened and rendered again
+    modified = os.stat(pdf_path).st_mtime_ns
+    key = (pdf_path, modified, page_num)
+    if key in _PAGES:
+        _PAGES.move_to_end(key)
+        return _PAGES[key]
+
+    if _DOCUMENTS.get(pdf_path, (None,))[0] != modified:
+        _DOCUMENTS[pdf_path] = (modified, fitz.open(pdf_path))
+    page = _DOCUMENTS[pdf_path][1].load_page(page_num)
+    _lru_put(_PAGES, key, (load_page_raster(page), page, key), PAGE_CACHE_SIZE)
+    return _PAGES[key]
+
+
+def _load_band(np_page_image, page_key, band):
+    """The enhanced band, the same pixels extraction sliced the crop out of"""
+    key = page_key + tuple(band)
+    if key in _BANDS:
+        _BANDS.move_to_end(key)
+    else:
+        _lru_put(_BANDS, key, enhance_band(np_page_image, band), BAND_CACHE_SIZE)
+    return _BANDS[key]
+
+
+def materialize_virtual_crop(recipe):
+    """
+    Cut a virtual crop out of its page exactly as save_alphabet_regions would
+    have saved it, in cv2.imread's BGR order. Crops enhanced in a row band or
+    the whole page are sliced out of that band, recorded at extraction.
+    """
+    source, _, x, y, w, h, _ = recipe['region']
+    with _VIRTUAL_LOCK:
+        crop = _CROPS.get(source)
+        if crop is not None:
+            _CROPS.move_to_end(source)
+            return crop
+
+        np_page_image, page, page_key = _load_page(recipe['pdf_path'], recipe['page'])
+        band = recipe.get('band')
+        if band is None:
+            (_, crop), = acquire_regions(np_page_image, page, [tuple(recipe['region'])], recipe['crop_mode'],
+                                         recipe['enhancement'], bands={})
+        else:
+            crop = slice_enhanced_band(_load_band(np_page_image, page_key, band), band, x, y, w, h)
+
+        crop = cv2.cvtColor(crop, cv2.COLOR_RGB2BGR)
+        # Shared between readers, nobody may draw on it
+        crop.flags.writeable = False
+        _lru_put(_CROPS, source, crop, EXTRACTION['virtual_crop_cache_size'])
+        return crop
+
+
+def forget_virtual_crops():
+    """Release the materialized crops, bands, pages and documents"""
+    with _VIRTUAL_LOCK:
+        _CROPS.clear()
+        _BANDS.clear()
+        _PAGES.clear()
+        _DOCUMENTS.clear()
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import numpy as np
+
+from app.config import INFERENCE
+from app.services.model_registry import get_model
+
+# Readiness of this worker, reported by the /ready endpoint
+_READINESS = {
+    'ready': False,
+    'warming_up': False,
+    'error': None,
+    'warmup_seconds': None,
+}
+_READINESS_LOCK = threading.Lock()
+
+
+def get_warmup_batch_sizes():
+    """Batch sizes the prediction path runs with: single crops and full batches"""
+    return INFERENCE.get('warmup_batch_sizes') or sorted({1, INFERENCE['batch_size']})
+
+
+def warm_up_model(batch_sizes=None, use_server=None):
+    """
+    Load the classifier and run a dummy batch at each batch size so graph
+    construction and kernel selection happen before the first real request.
+
+    Args:
+        batch_sizes: Batch sizes to run (defaults to get_warmup_batch_sizes())
+        use_server: Warm up through the shared inference server instead of the
+                    in-process model (defaults to whether one is configured)
+    Returns:
+        True if the worker is ready to serve predictions
+    """
+    batch_sizes = batch_sizes or get_warmup_batch_sizes()
+    if use_server is None:
+        use_server = bool(INFERENCE['server_address'])
+
+    with _READINESS_LOCK:
+        _READINESS['warming_up'] = True
+        _READINESS['error'] = None
+
+    started = time.perf_counter()
+    try:
+        if use_server:
+            from app.services.inference_server import predict_remote
+
+            for batch_size in batch_sizes:
+                predict_remote(np.zeros((batch_size, 32, 32), dtype=np.uint8))
+        else:
+            model = get_model()
+            for batch_size in batch_sizes:
+                model.predict_on_batch(np.zeros((batch_size, 32, 32), dtype=np.uint8))
+    except Exception as e:
+        print(f"Model warm-up failed: {e}")
+        with _READINESS_LOCK:
+            _READINESS['warming_up'] = False
+            _READINESS['error'] = str(e)
+        return False
+
+    elapsed = time.perf_counter() - started
+    print(f"Model warm-up finished in {elapsed:.2f}s for batch sizes {batch_sizes}")
+    with _READINESS_LOCK:
+        _READINESS['ready'] = True
+        _READINESS['warming_up'] = False
+        _READINESS['warmup_seconds'] = round(elapsed, 3)
+    return True
+
+
+def _warm_up_until_ready():
+    # The inference server may still be starting, keep trying until it answers
+    while not warm_up_model():
+        time.sleep(INFERENCE['warmup_retry_seconds'])
+
+
+def start_model_warm_up():
+    """Warm up in the background so the app can answer health checks meanwhile"""
+    thread = threading.Thread(target=_warm_up_until_ready, daemon=True)
+    thread.start()
+    return thread
+
+
+def get_readiness():
+    """Return a copy of the readiness state"""
+    with _READINESS_LOCK:
+        return dict(_READINESS)
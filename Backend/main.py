@@ -1,5 +1,6 @@
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.serving import is_running_from_reloader
 from app.models.init_db import initialise_db
 import os
 from datetime import timedelta
@@ -19,6 +20,11 @@ from app.auth.save_kern import save_kern_blueprint
 from app.auth.get_segmented_data import get_segmented_data_blueprint
 from app.auth.get_kern_data import get_kern_data_blueprint
 from app.auth.clear_outputs import clear_outputs_blueprint
+from app.auth.health_check import health_check_blueprint
+from app.auth.page_thumbnails import page_thumbnails_blueprint
+from app.config import INFERENCE
+from app.services.warmup import start_model_warm_up
+from app.services.cpu_budget import configure_cpu_budget
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'swar_lipi_app_2025'
@@ -64,9 +70,22 @@ app.register_blueprint(save_kern_blueprint)
 app.register_blueprint(get_segmented_data_blueprint)
 app.register_blueprint(get_kern_data_blueprint)
 app.register_blueprint(clear_outputs_blueprint)
+app.register_blueprint(health_check_blueprint)
+app.register_blueprint(page_thumbnails_blueprint)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    debug = True
+    # Only in the process that serves requests: spawn pool workers import this module as
+    # __mp_main__, and with debug the reloader's parent process only watches files
+    if not debug or is_running_from_reloader():
+        # Split the cores between OpenCV, TensorFlow and the worker pools before either starts
+        configure_cpu_budget()
+
+        # Warm up the classifier so the first /final_rows does not pay for it
+        if INFERENCE['warmup_on_boot']:
+            start_model_warm_up()
+
+    app.run(host='0.0.0.0', port=5000, debug=debug)
 
 @app.route('/', methods=['GET'])
 def home():
@@ -0,0 +1,68 @@
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Services import their siblings both as app.services.x and as bare modules
+sys.path[:0] = [BACKEND, os.path.join(BACKEND, 'app', 'services')]
+
+from app.config import EXTRACTION, PATHS  # noqa: E402
+
+SAMPLE_PDF = os.path.join(BACKEND, 'uploads', 'asawari_3_taal.pdf')
+OTHER_PDF = os.path.join(BACKEND, 'uploads', 'yaman_3_taal.pdf')
+
+
+@pytest.fixture(autouse=True)
+def job_folder(tmp_path, monkeypatch):
+    """Run each test in its own working directory, with the per-job and cache paths inside it"""
+    monkeypatch.chdir(tmp_path)
+    for name in ('initial_segmentation', 'working_composition', 'working_composition_segmented',
+                 'annotated_images', 'glyph_index', 'crop_store', 'lazy_extraction', 'extraction_cache',
+                 'page_rasters'):
+        monkeypatch.setitem(PATHS, name, os.path.join(str(tmp_path), PATHS[name]))
+    for name, value in (('workers', 1), ('lazy', False), ('crop_store', False), ('virtual_crops', False),
+                        ('cache', False), ('page_raster_cache', False)):
+        monkeypatch.setitem(EXTRACTION, name, value)
+    return tmp_path
+
+
+@pytest.fixture(scope='session')
+def sample_pdf():
+    return SAMPLE_PDF
+
+
+@pytest.fixture(scope='session')
+def other_pdf():
+    return OTHER_PDF
+
+
+def extract_first_page(folder, enhancement='per_crop', crop_mode='upscale'):
+    """Eagerly extract the first page's glyph crops as PNGs, returns their sorted paths"""
+    from app.services.initial_extraction import extract_alphabets
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(folder)
+        for name, value in (('crop_store', False), ('virtual_crops', False), ('page_raster_cache', False)):
+            monkeypatch.setitem(EXTRACTION, name, value)
+        extract_alphabets(SAMPLE_PDF, str(folder / 'crops'), workers=1, crop_mode=crop_mode, lazy=False,
+                          enhancement=enhancement, page_nums=[0])
+    return sorted(str(path) for path in (folder / 'crops').glob('*.png'))
+
+
+@pytest.fixture(scope='session')
+def extracted_crops(tmp_path_factory):
+    """PNG paths of the glyph crops extraction saves for the first page of a real composition"""
+    return extract_first_page(tmp_path_factory.mktemp('extracted'))
+
+
+@pytest.fixture(scope='session')
+def eager_crops(tmp_path_factory, extracted_crops):
+    """eager_crops(enhancement): PNG paths of the first page's crops extracted with that enhancement"""
+    extracted = {'per_crop': extracted_crops}
+
+    def crops(enhancement):
+        if enhancement not in extracted:
+            extracted[enhancement] = extract_first_page(tmp_path_factory.mktemp(enhancement), enhancement)
+        return extracted[enhancement]
+    return crops
@@ -0,0 +1,70 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from app.config import EXTRACTION, PATHS
+from app.services.crop_store import read_crop, write_crop, list_crops
+from app.services.initial_extraction import extract_alphabets, materialize_crops_in_row_range
+from app.services.virtual_crops import forget_virtual_crops
+
+
+def assert_same_crops(folder, eager_paths, read=read_crop):
+    for png_path in eager_paths:
+        image_path = os.path.join(folder, os.path.basename(png_path))
+        np.testing.assert_array_equal(read(image_path), cv2.imread(png_path), err_msg=png_path)
+
+
+@pytest.mark.parametrize('enhancement', ['per_crop', 'row', 'page'])
+def test_virtual_crops_match_eager_extraction(eager_crops, sample_pdf, job_folder, monkeypatch, enhancement):
+    monkeypatch.setitem(EXTRACTION, 'virtual_crops', True)
+    folder = str(job_folder / 'virtual')
+    extract_alphabets(sample_pdf, folder, workers=1, crop_mode='upscale', lazy=False, enhancement=enhancement,
+                      page_nums=[0])
+    eager_paths = eager_crops(enhancement)
+    assert list_crops(folder) == {os.path.basename(path) for path in eager_paths}
+
+    # Every read order must give the same pixels: a cold cache, crops out of row order, then the rest
+    forget_virtual_crops()
+    assert_same_crops(folder, eager_paths[::7] + eager_paths[::-1])
+
+    # Crops a stage rewrote into the store no longer are virtual, their neighbours must not change
+    monkeypatch.setitem(EXTRACTION, 'crop_store', True)
+    for png_path in eager_paths[::3]:
+        image_path = os.path.join(folder, os.path.basename(png_path))
+        write_crop(image_path, read_crop(image_path))
+    forget_virtual_crops()
+    assert_same_crops(folder, eager_paths[::-1])
+    forget_virtual_crops()
+
+
+@pytest.mark.parametrize('enhancement', ['per_crop', 'row', 'page'])
+def test_lazy_crops_match_eager_extraction(eager_crops, sample_pdf, job_folder, enhancement):
+    folder = str(job_folder / 'lazy')
+    _, row_mappings = extract_alphabets(sample_pdf, folder, workers=1, crop_mode='upscale', lazy=True,
+                                        enhancement=enhancement, page_nums=[0])
+    rows = [row_num for row_num, _, _ in row_mappings[0]]
+    first_row, last_row = rows[len(rows) // 3], rows[len(rows) // 2]
+    assert materialize_crops_in_row_range(folder, first_row, last_row)
+
+    in_range = [path for path in eager_crops(enhancement)
+                if first_row <= int(os.path.basename(path).split('_row')[1].split('_')[0]) <= last_row]
+    assert in_range
+    assert sorted(os.listdir(folder)) == sorted(os.path.basename(path) for path in in_range)
+    assert_same_crops(folder, in_range, cv2.imread)
+
+
+def test_lazy_record_belongs_to_the_job_and_its_pdf(sample_pdf, other_pdf, job_folder):
+    folder = str(job_folder / 'lazy')
+    extract_alphabets(sample_pdf, folder, workers=1, lazy=True, page_nums=[0])
+    assert os.path.exists(f"{PATHS['lazy_extraction']}.json")
+    assert os.path.dirname(PATHS['lazy_extraction']) == PATHS['initial_segmentation']
+
+    # A record of another PDF is never materialized
+    assert not materialize_crops_in_row_range(folder, 0, 1000, other_pdf)
+    assert not os.listdir(folder)
+
+    # Nor one that a later extraction replaced
+    extract_alphabets(sample_pdf, str(job_folder / 'eager'), workers=1, lazy=False, page_nums=[0])
+    assert not materialize_crops_in_row_range(folder, 0, 1000, sample_pdf)
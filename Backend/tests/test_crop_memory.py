@@ -0,0 +1,53 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.services.crop_memory import remember_crop, forget_crops, decode_like_imread
+from app.services.image_processing import preprocess_array_to_predict, preprocess_image_to_predict
+
+
+def preprocess_from_png(image_path):
+    """Classifier input as it was built before crops were kept in memory"""
+    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    return np.expand_dims(cv2.resize(image, (32, 32)), axis=0)
+
+
+@pytest.fixture(autouse=True)
+def empty_crop_memory():
+    forget_crops()
+    yield
+    forget_crops()
+
+
+def test_remembered_crops_preprocess_like_their_pngs(extracted_crops):
+    assert extracted_crops
+    for image_path in extracted_crops:
+        # What a segmentation stage holds after writing the PNG
+        remember_crop(image_path, cv2.imread(image_path))
+        np.testing.assert_array_equal(preprocess_image_to_predict(image_path), preprocess_from_png(image_path),
+                                      err_msg=image_path)
+
+
+def test_arrays_preprocess_like_their_pngs(extracted_crops):
+    for image_path in extracted_crops:
+        np.testing.assert_array_equal(preprocess_array_to_predict(cv2.imread(image_path)),
+                                      preprocess_from_png(image_path), err_msg=image_path)
+
+
+@pytest.mark.parametrize('flags', [cv2.IMREAD_COLOR, cv2.IMREAD_GRAYSCALE, cv2.IMREAD_UNCHANGED])
+def test_decode_like_imread(extracted_crops, flags):
+    for image_path in extracted_crops[:50]:
+        np.testing.assert_array_equal(decode_like_imread(cv2.imread(image_path, cv2.IMREAD_UNCHANGED), flags),
+                                      cv2.imread(image_path, flags), err_msg=image_path)
+
+
+def test_grey_matches_the_png_decoder_for_every_colour():
+    # Every 8-bit BGR colour once, plus an alpha channel the decoder drops
+    colours = np.arange(1 << 24, dtype=np.uint32)
+    image = np.stack([(colours >> 16) & 255, (colours >> 8) & 255, colours & 255, colours & 255], axis=-1)
+    image = image.astype(np.uint8).reshape(4096, 4096, 4)
+    for crop in (image[:, :, :3], image):
+        ok, png = cv2.imencode('.png', crop)
+        assert ok
+        np.testing.assert_array_equal(decode_like_imread(crop, cv2.IMREAD_GRAYSCALE),
+                                      cv2.imdecode(png, cv2.IMREAD_GRAYSCALE))
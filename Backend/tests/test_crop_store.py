@@ -0,0 +1,26 @@
+import os
+
+import cv2
+import numpy as np
+
+from app.config import EXTRACTION
+from app.services.crop_store import read_crop, list_crops, encode_crop_png
+from app.services.initial_extraction import extract_alphabets
+
+
+def test_stored_crops_read_like_their_pngs(extracted_crops, sample_pdf, job_folder, monkeypatch):
+    monkeypatch.setitem(EXTRACTION, 'crop_store', True)
+    folder = str(job_folder / 'stored')
+    extract_alphabets(sample_pdf, folder, workers=1, crop_mode='upscale', lazy=False, enhancement='per_crop',
+                      page_nums=[0])
+
+    assert list_crops(folder) == {os.path.basename(path) for path in extracted_crops}
+    assert not os.listdir(folder)
+
+    for png_path in extracted_crops:
+        image_path = os.path.join(folder, os.path.basename(png_path))
+        for flags in (cv2.IMREAD_COLOR, cv2.IMREAD_GRAYSCALE):
+            np.testing.assert_array_equal(read_crop(image_path, flags), cv2.imread(png_path, flags), err_msg=png_path)
+        png = encode_crop_png(image_path)
+        np.testing.assert_array_equal(cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_UNCHANGED),
+                                      cv2.imread(png_path, cv2.IMREAD_UNCHANGED), err_msg=png_path)
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+
+import flask
+import numpy as np
+import pytest
+
+from app.config import INFERENCE, PATHS, PIPELINE
+from app.services import model_registry
+from app.services.model_registry import get_runtime_model_path
+
+from conftest import BACKEND, SAMPLE_PDF
+
+# The routes read taal_info.json from the working directory when first imported
+with pytest.MonkeyPatch.context() as patch:
+    patch.chdir(BACKEND)
+    from app.auth.final_rows import final_rows_blueprint
+    from app.auth.get_initial_rows import initial_rows_blueprint
+    from app.auth.update_initial_rows import update_initial_rows_blueprint
+    from app.auth.update_sam_taali import update_sam_taali_blueprint
+
+# Read from the working directory by the pipeline
+JOB_FILES = ('classes.json', 'taal_info.json', 'kern_map.json')
+JOB_PATHS = {name: PATHS[name] for name in ('initial_segmentation', 'working_composition',
+                                            'working_composition_segmented', 'annotated_images', 'glyph_index')}
+
+
+class HashModel:
+    """Deterministic stand-in for the classifier: the class follows from the input's bytes"""
+
+    classes = 30
+
+    def predict_on_batch(self, batch):
+        probabilities = np.zeros((len(batch), self.classes), dtype=np.float32)
+        for i, image in enumerate(np.asarray(batch)):
+            probabilities[i, int(hashlib.md5(image.tobytes()).hexdigest(), 16) % self.classes] = 1
+        return probabilities
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setitem(model_registry._MODEL_REGISTRY, 'model', HashModel())
+    monkeypatch.setitem(model_registry._MODEL_REGISTRY, 'runtime', INFERENCE['runtime'])
+    monkeypatch.setitem(model_registry._MODEL_REGISTRY, 'path', get_runtime_model_path())
+    monkeypatch.setitem(INFERENCE, 'server_address', None)
+    monkeypatch.setitem(INFERENCE, 'prediction_cache', False)
+    monkeypatch.setitem(PATHS, 'curr_pdf_path', SAMPLE_PDF)
+
+    app = flask.Flask(__name__)
+    for blueprint in (initial_rows_blueprint, update_initial_rows_blueprint, update_sam_taali_blueprint,
+                      final_rows_blueprint):
+        app.register_blueprint(blueprint)
+    return app.test_client()
+
+
+def run_job(monkeypatch, client, folder):
+    """/get_initial_rows through /final_rows on the sample PDF in folder, returns the /final_rows response"""
+    os.makedirs(folder)
+    monkeypatch.chdir(folder)
+    for name in JOB_FILES:
+        shutil.copy(os.path.join(BACKEND, name), name)
+    for name, path in JOB_PATHS.items():
+        monkeypatch.setitem(PATHS, name, os.path.join(folder, path))
+
+    assert client.get('/get_initial_rows').status_code == 200
+    rows = client.post('/update_initial_rows', json={'startRow': 3, 'endRow': 20, 'raag': 'Asavari', 'taal': 'Teentaal',
+                                                     'laya': 'Madhya', 'source': 'test', 'pageNo': 1})
+    assert rows.status_code == 200
+    sam_taali = client.post('/update_sam_taali', json={'sam_and_taalis_rows': sorted(rows.json['sam_and_taalis_rows'])})
+    assert sam_taali.status_code == 200
+    final = client.post('/final_rows', json=dict(sam_taali.json['row_categories'], row_paths=rows.json['row_paths']))
+    assert final.status_code == 200
+
+    result = final.json
+    result['predictions']['metadata'].pop('created', None)
+    # Same job in another folder
+    return flask.json.loads(flask.json.dumps(result).replace(folder, '<job>'))
+
+
+def test_overlapped_final_rows_match_sequential(monkeypatch, job_folder, client):
+    monkeypatch.setitem(PIPELINE, 'overlap_final_rows', False)
+    sequential = run_job(monkeypatch, client, str(job_folder / 'sequential'))
+    monkeypatch.setitem(PIPELINE, 'overlap_final_rows', True)
+    overlapped = run_job(monkeypatch, client, str(job_folder / 'overlapped'))
+
+    assert sequential['predictions']['predictions']
+    assert overlapped == sequential
@@ -0,0 +1,96 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from app.config import EXTRACTION, PATHS
+from app.services.copy_image_in_row_range import copy_images_in_row_range
+from app.services.crop_store import import_crop, list_crops, read_crop
+from app.services.glyph_index import (build_glyph_index, count_glyphs_per_row, parse_glyph_filename, query_glyphs,
+                                      set_glyph_columns)
+from app.services.initial_extraction import extract_alphabets
+from app.services.mapping import assign_column_numbers
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_ROW, LAST_ROW = 3, 20
+
+
+@pytest.fixture
+def identifications(monkeypatch):
+    # Reads taal_info.json from the working directory when first imported
+    monkeypatch.chdir(BACKEND)
+    from app.services import identifications
+    return identifications
+
+
+@pytest.fixture
+def composition(monkeypatch, job_folder, sample_pdf, identifications):
+    """Working composition of the sample page with its columns assigned, as /update_sam_taali leaves it"""
+    monkeypatch.chdir(job_folder)
+    _, row_mappings = extract_alphabets(sample_pdf, PATHS['initial_segmentation'], workers=1, page_nums=[0])
+    copy_images_in_row_range(PATHS['initial_segmentation'], PATHS['working_composition'], FIRST_ROW, LAST_ROW)
+    build_glyph_index()
+    sam_and_taalis_rows = identifications.get_sam_and_taalis_rows(count_glyphs_per_row(), 'Teentaal')
+    subgroup_ranges = assign_column_numbers(row_mappings, FIRST_ROW, sam_and_taalis_rows)
+    return row_mappings, sam_and_taalis_rows, subgroup_ranges
+
+
+def test_columns_are_in_the_crop_names(composition):
+    glyphs = query_glyphs()
+    assert any(col is not None for _, _, _, col, *_ in glyphs)
+    assert any(extra for *_, extra in glyphs)
+    assert sorted(os.listdir(PATHS['working_composition'])) == sorted(glyph[0] for glyph in glyphs)
+
+    for filename, page_num, row_num, col_num, x, y, w, h, extra in glyphs:
+        if col_num is not None:
+            assert f"_row{row_num}_col{col_num}_x{x}_" in filename
+        elif extra:
+            assert f"_row{row_num}_extra_x{x}_" in filename
+        assert parse_glyph_filename(filename) == (page_num, row_num, col_num, x, y, w, h, extra)
+
+
+def test_row_categories_come_from_the_index(monkeypatch, composition, identifications):
+    _, _, subgroup_ranges = composition
+    expected = {'articulation': [], 'kann_swar': [], 'swar': [], 'lyrics': []}
+    glyphs = [(filename, page_num, row_num, x, y, w, h)
+              for filename, page_num, row_num, _, x, y, w, h, _ in query_glyphs(with_col=True)]
+    for start_row, end_row in subgroup_ranges:
+        rows = identifications.classify_rows([glyph for glyph in glyphs if start_row <= glyph[2] <= end_row])
+        for name, category_rows in zip(expected, rows):
+            expected[name].extend(sorted(category_rows))
+    assert expected['articulation']
+
+    def listdir(path):
+        raise AssertionError(f"Listed {path}")
+    monkeypatch.setattr(os, 'listdir', listdir)
+    assert identifications.classify_rows_in_subgroups(subgroup_ranges) == expected
+
+
+def test_assigning_columns_again_starts_over(composition):
+    row_mappings, sam_and_taalis_rows, subgroup_ranges = composition
+    glyphs = query_glyphs()
+    assert assign_column_numbers(row_mappings, FIRST_ROW, sam_and_taalis_rows) == subgroup_ranges
+    assert query_glyphs() == glyphs
+    assert sorted(os.listdir(PATHS['working_composition'])) == sorted(glyph[0] for glyph in glyphs)
+
+
+def test_stored_crops_are_renamed(monkeypatch, extracted_crops):
+    monkeypatch.setitem(EXTRACTION, 'crop_store', True)
+    folder = PATHS['working_composition']
+    for image_path in extracted_crops:
+        import_crop(image_path, os.path.join(folder, os.path.basename(image_path)))
+    build_glyph_index()
+
+    sources = {os.path.basename(image_path): image_path for image_path in extracted_crops}
+    set_glyph_columns((filename, col) for col, filename in enumerate(sorted(sources)[:10], start=1))
+
+    renamed = {glyph[0]: glyph for glyph in query_glyphs(with_col=True)}
+    assert len(renamed) == 10
+    assert list_crops(folder) == {glyph[0] for glyph in query_glyphs()}
+    for col, filename in enumerate(sorted(sources)[:10], start=1):
+        page_num, row_num, _, x, y, w, h, _ = parse_glyph_filename(filename)
+        new_filename = f"{page_num}_row{row_num}_col{col}_x{x}_y{y}_w{w}_h{h}.png"
+        assert new_filename in renamed
+        np.testing.assert_array_equal(read_crop(os.path.join(folder, new_filename)), cv2.imread(sources[filename]))
+        assert read_crop(os.path.join(folder, filename)) is None
@@ -0,0 +1,98 @@
+import os
+
+import glob
+
+import cv2
+import fitz
+import numpy as np
+import pytest
+
+from app.config import EXTRACTION, PATHS
+from app.services.glyph_index import parse_glyph_filename
+from app.services.initial_extraction import (ENHANCEMENT_SCALE, detect_glyph_stats, detect_page_glyphs, detect_vector_rects,
+                                            extract_alphabets)
+from app.services.page_rasters import render_page
+
+from conftest import BACKEND, extract_first_page
+
+UPLOADED_PDFS = sorted(glob.glob(os.path.join(BACKEND, 'uploads', '*.pdf')))
+
+
+@pytest.mark.parametrize('render_zoom', [2, 3, 5])
+def test_rendered_crops_are_at_the_enhancement_scale(monkeypatch, tmp_path, render_zoom):
+    monkeypatch.setitem(EXTRACTION, 'render_zoom', render_zoom)
+    crops = extract_first_page(tmp_path, crop_mode='render')
+    assert crops
+    for image_path in crops:
+        _, _, _, _, _, w, h, _ = parse_glyph_filename(os.path.basename(image_path))
+        assert cv2.imread(image_path).shape[:2] == (h * ENHANCEMENT_SCALE, w * ENHANCEMENT_SCALE), image_path
+
+
+@pytest.mark.parametrize('pdf_path', UPLOADED_PDFS, ids=os.path.basename)
+def test_components_find_the_contours_glyphs(pdf_path):
+    for page in fitz.open(pdf_path):
+        np_page_image = render_page(page)
+        np.testing.assert_array_equal(detect_glyph_stats(np_page_image, 'components'),
+                                      detect_glyph_stats(np_page_image, 'contours'), err_msg=f"page {page.number}")
+
+
+@pytest.fixture(scope='session')
+def born_digital_pdf(tmp_path_factory):
+    """A page with a text layer: words, spaced notes with '-' and '.', and drawn articulation lines"""
+    path = str(tmp_path_factory.mktemp('born_digital') / 'born_digital.pdf')
+    document = fitz.open()
+    page = document.new_page(width=595, height=842)
+    for i, line in enumerate(["Sa Re Ga Ma - Pa . Dha Ni", "ni. re- ga- ma. | pa dha", "S  -  R  .  G  -  m  .  P"]):
+        page.insert_text((72, 120 + 40 * i), line, fontsize=14, fontname='helv')
+    page.draw_line((100, 300), (130, 300), width=1.5)
+    page.draw_line((200, 305), (240, 305), width=2)
+    document.save(path)
+    return path
+
+
+def test_text_layer_boxes_match_the_raster(born_digital_pdf, sample_pdf):
+    page = fitz.open(born_digital_pdf).load_page(0)
+    assert detect_vector_rects(page) is not None
+    raster = detect_page_glyphs(page, vector_text=False)
+    assert any(w < 6 and h < 6 for _, _, w, h in raster)
+    assert detect_page_glyphs(page, vector_text=True) == raster
+
+    # Scans have no text layer and take the raster path
+    page = fitz.open(sample_pdf).load_page(0)
+    assert detect_vector_rects(page) is None
+    assert detect_page_glyphs(page, vector_text=True) == detect_page_glyphs(page, vector_text=False)
+
+
+@pytest.fixture(scope='session')
+def multi_page_pdf(tmp_path_factory):
+    """Three of the uploads as one PDF"""
+    path = str(tmp_path_factory.mktemp('multi_page') / 'multi_page.pdf')
+    document = fitz.open()
+    for name in ('asawari_3_taal.pdf', 'yaman_3_taal.pdf', 'bilawal_3_taal.pdf'):
+        document.insert_pdf(fitz.open(os.path.join(BACKEND, 'uploads', name)))
+    document.save(path)
+    return path
+
+
+def read_crops(folder):
+    crops = {}
+    for filename in os.listdir(folder):
+        with open(os.path.join(folder, filename), 'rb') as f:
+            crops[filename] = f.read()
+    return crops
+
+
+def test_parallel_extraction_matches_sequential(monkeypatch, job_folder, multi_page_pdf):
+    sequential = extract_alphabets(multi_page_pdf, str(job_folder / 'sequential'), workers=1)
+
+    # Workers must follow the job's paths, not the ones of a freshly imported config
+    monkeypatch.setitem(EXTRACTION, 'page_raster_cache', True)
+    monkeypatch.setitem(PATHS, 'page_rasters', str(job_folder / 'job_rasters'))
+    parallel = extract_alphabets(multi_page_pdf, str(job_folder / 'parallel'), workers=3)
+
+    assert parallel == sequential
+    crops = read_crops(job_folder / 'sequential')
+    assert len(crops) > 300
+    assert read_crops(job_folder / 'parallel') == crops
+    assert not os.path.exists('page_rasters')
+    assert len(glob.glob(os.path.join(PATHS['page_rasters'], '*', '*.npy'))) == 3
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from app.services.mapping import IntervalIndex, assign_number, create_mapping
+
+MAPPINGS = {
+    'empty': [],
+    'disjoint': [(1, 10, 20), (2, 25, 30), (3, 40, 40)],
+    'touching': [(1, 10, 20), (2, 20, 30), (3, 30, 35)],
+    'overlapping': [(1, 10, 25), (2, 20, 30), (3, 28, 40)],
+    'nested': [(1, 10, 50), (2, 20, 30), (3, 22, 24)],
+    'nested_inner_first': [(1, 20, 30), (2, 10, 50)],
+    'unsorted': [(1, 40, 45), (2, 10, 20), (3, 15, 42)],
+    'same_lower': [(1, 10, 12), (2, 10, 30), (3, 10, 11)],
+    'single_points': [(5, 3, 3), (6, 3, 3), (7, 4, 4)],
+}
+
+
+def assert_matches_assign_number(mapping):
+    index = IntervalIndex(mapping)
+    limits = [limit for _, lower, upper in mapping for limit in (lower, upper)] or [0]
+    coords = np.arange(min(limits) - 3, max(limits) + 4)
+    expected = [assign_number(int(coord), mapping) for coord in coords]
+
+    assert [index.lookup(int(coord)) for coord in coords] == expected
+    assert index.lookup_many(coords).tolist() == expected
+
+
+@pytest.mark.parametrize('name', MAPPINGS)
+def test_lookup_matches_assign_number(name):
+    assert_matches_assign_number(MAPPINGS[name])
+
+
+def test_touching_and_overlapping_limits_take_the_fallback():
+    assert IntervalIndex(MAPPINGS['disjoint']).disjoint
+    for name in ('touching', 'overlapping', 'nested', 'unsorted', 'same_lower', 'single_points'):
+        assert not IntervalIndex(MAPPINGS[name]).disjoint, name
+
+
+def test_random_mappings_match_assign_number():
+    rng = np.random.default_rng(17)
+    for _ in range(200):
+        lowers = rng.integers(0, 100, rng.integers(1, 12))
+        mapping = [(num, int(lower), int(lower + rng.integers(0, 15))) for num, lower in enumerate(lowers, start=1)]
+        assert_matches_assign_number(mapping)
+
+
+def test_create_mapping_intervals_are_disjoint():
+    rng = np.random.default_rng(3)
+    coordinates = [(int(x), int(y), int(w), int(h)) for x, y, w, h in rng.integers(1, 400, (300, 4))]
+    mapping = create_mapping(sorted(coordinates, key=lambda item: item[1]), 3, is_row=True)
+    assert IntervalIndex(mapping).disjoint
+    assert_matches_assign_number(mapping)
@@ -0,0 +1,83 @@
+import hashlib
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from app.config import INFERENCE
+from app.services.generators import predict_classes, predict_classes_from_arrays
+from app.services.image_processing import preprocess_images_to_predict
+from app.services.prediction_cache import clear_prediction_cache, get_cache_stats
+
+
+class FakeModel:
+    """Deterministic stand-in for the classifier: probabilities derived from each input's bytes"""
+
+    classes = 30
+
+    def __init__(self):
+        self.images_seen = 0
+
+    def predict_on_batch(self, batch):
+        self.images_seen += len(batch)
+        probabilities = np.zeros((len(batch), self.classes), dtype=np.float32)
+        for i, image in enumerate(batch):
+            digest = hashlib.md5(np.ascontiguousarray(image).tobytes()).digest()
+            probabilities[i] = np.frombuffer(digest * 2, dtype=np.uint8)[:self.classes] / 255
+        return probabilities
+
+
+@pytest.fixture(autouse=True)
+def empty_prediction_cache(monkeypatch):
+    monkeypatch.setitem(INFERENCE, 'server_address', None)
+    clear_prediction_cache()
+    yield
+    clear_prediction_cache()
+
+
+@pytest.fixture(scope='module')
+def crop_batch(extracted_crops):
+    return preprocess_images_to_predict(extracted_crops)
+
+
+def test_cached_predictions_match_the_model(monkeypatch, crop_batch):
+    monkeypatch.setitem(INFERENCE, 'prediction_cache', False)
+    expected = predict_classes(crop_batch, FakeModel())
+
+    monkeypatch.setitem(INFERENCE, 'prediction_cache', True)
+    model = FakeModel()
+    for _ in range(2):
+        class_indices, probabilities = predict_classes(crop_batch, model)
+        np.testing.assert_array_equal(class_indices, expected[0])
+        np.testing.assert_array_equal(probabilities, expected[1])
+
+    # Identical glyphs run once, the repeat comes entirely from memory
+    assert model.images_seen == len(np.unique(crop_batch.reshape(len(crop_batch), -1), axis=0))
+    assert get_cache_stats()['memory_hits'] >= len(crop_batch)
+
+
+def test_cache_stays_in_memory_by_default(monkeypatch, job_folder, extracted_crops):
+    monkeypatch.setitem(INFERENCE, 'prediction_cache', True)
+    assert INFERENCE['prediction_cache_path'] is None
+
+    images = [cv2.imread(path) for path in extracted_crops[:20]]
+    predict_classes_from_arrays(images, model=FakeModel())
+
+    assert not [name for name in os.listdir(job_folder) if name.endswith('.sqlite3')]
+
+
+def test_disk_tier_when_a_path_is_set(monkeypatch, job_folder, crop_batch):
+    cache_path = str(job_folder / 'prediction_cache.sqlite3')
+    monkeypatch.setitem(INFERENCE, 'prediction_cache', True)
+    monkeypatch.setitem(INFERENCE, 'prediction_cache_path', cache_path)
+    expected = predict_classes(crop_batch, FakeModel())
+    assert os.path.exists(cache_path)
+
+    # A fresh process only has the disk tier
+    monkeypatch.setitem(INFERENCE, 'prediction_cache_size', 0)
+    model = FakeModel()
+    class_indices, probabilities = predict_classes(crop_batch, model)
+    np.testing.assert_array_equal(class_indices, expected[0])
+    np.testing.assert_array_equal(probabilities, expected[1])
+    assert model.images_seen == 0